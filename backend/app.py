@@ -1,45 +1,177 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Blueprint, Flask, Request, Response, current_app, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 from flask_login import LoginManager, login_required, current_user
 import sqlite3
+import hashlib
+import hmac
+import ipaddress
 import json
 import os
-from datetime import datetime
+from functools import wraps
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.middleware.proxy_fix import ProxyFix
 from assessment_engine import AssessmentEngine
 from chatbot import CareerChatbot
-from models import get_user_by_id, get_user_assessments, get_user_resumes, get_current_resume, update_user
+from models import (
+    get_cached_user, user_cache, get_latest_assessment, get_current_resume, update_user, get_resume_job,
+    store_resume_blob, get_user_assessments_page, get_user_resumes_page, get_user_chats_page
+)
 from auth import auth_bp
+from db import pool, transaction
+from payloads import StaticPayload, dumps, dumps_with_fragment, json_response
+import passwords
+import resume_parser
+import storage
+import chat_memory
+import chat_service
+from write_behind import writer
+from scheduler import RateLimited, client_for
+import metrics
+from resume_digest import digest_cache
 
-app = Flask(__name__, static_folder='../frontend', static_url_path='')
-CORS(app, supports_credentials=True)  # Enable CORS with credentials support
-
-# Set secret key for sessions
-app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+main_bp = Blueprint('main', __name__)
 
 # Initialize Flask-Login
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'index'
+login_manager.login_view = 'main.index'
 login_manager.session_protection = "strong"
 
 @login_manager.user_loader
 def load_user(user_id):
     """Load user for Flask-Login"""
-    return get_user_by_id(int(user_id))
+    return get_cached_user(int(user_id))
+
+# Largest batch accepted by /api/assessments/batch-score
+MAX_BATCH_ASSESSMENTS = int(os.getenv('MAX_BATCH_ASSESSMENTS', 5000))
+
+# Default page size for history endpoints
+DEFAULT_PAGE_SIZE = 20
+
+# Reverse proxies in front of the app (e.g. 1 on Render/Railway); their X-Forwarded-For
+# is trusted so guests are rate limited by their own address, not the proxy's
+TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', 0))
+
+# Largest request body any route reads (JSON batches included); uploads are capped lower
+MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
 
-# Register auth blueprint
-app.register_blueprint(auth_bp)
+# Bearer token for /metrics and /api/cache-stats; without one they only answer internal addresses
+DIAGNOSTICS_TOKEN = os.getenv('DIAGNOSTICS_TOKEN', '')
+
+# What the first upload route stored as resume_text instead of extracted text
+LEGACY_RESUME_PLACEHOLDER = "Resume uploaded successfully. Content parsing will be implemented in next iteration."
 
 # Initialize components
 assessment_engine = AssessmentEngine()
 chatbot = CareerChatbot()
 
+# Payloads that only change between deploys, rendered once at startup
+questions_payload = StaticPayload(assessment_engine.get_questions())
+personality_types_payload = StaticPayload(assessment_engine.personality_types)
+personality_type_payloads = {
+    name: StaticPayload(results) for name, results in assessment_engine.personality_types.items()
+}
+personality_result_fragments = {
+    name: dumps(results) for name, results in assessment_engine.personality_types.items()
+}
+
+def _register_stats_metrics():
+    """Expose the counters the caches, chatbot and write-behind queue already keep on /metrics"""
+    caches = {'users': user_cache, 'chat_responses': chatbot.response_cache, 'resume_digests': digest_cache}
+    
+    def cache_stat(key):
+        return lambda: [((name,), cache.stats()[key]) for name, cache in caches.items()]
+    
+    metrics.collector('cache_hits_total', 'In-process cache hits', 'counter', ('cache',), cache_stat('hits'))
+    metrics.collector('cache_misses_total', 'In-process cache misses', 'counter', ('cache',), cache_stat('misses'))
+    metrics.collector('cache_entries', 'In-process cache size', 'gauge', ('cache',), cache_stat('size'))
+    metrics.collector('chat_coalesced_total', 'Chats that shared an identical in-flight LLM call', 'counter', (),
+                      lambda: [((), chatbot.in_flight.coalesced + chatbot.async_in_flight.coalesced)])
+    metrics.collector('llm_pool_events_total', 'Provider pool hedges, hedge wins, skipped hedges, failovers and deadline timeouts',
+                      'counter', ('event',),
+                      lambda: [((event,), chatbot.providers.stats()[key]) for event, key in
+                               (('hedge', 'hedges'), ('hedge_win', 'hedge_wins'), ('hedge_skipped', 'hedges_skipped'),
+                                ('failover', 'failovers'), ('timeout', 'timeouts'))])
+    metrics.collector('llm_circuit_state', 'LLM circuit breaker state (0 closed, 1 half-open, 2 open)', 'gauge', (),
+                      lambda: [((), chatbot.breaker.stats()['state_code'])])
+    metrics.collector('llm_circuit_rejected_total', 'LLM calls rejected by the open circuit breaker', 'counter', (),
+                      lambda: [((), chatbot.breaker.rejected)])
+    metrics.collector('chat_llm_slots_active', 'LLM calls holding a scheduler slot', 'gauge', (),
+                      lambda: [((), chatbot.scheduler.stats()['active'])])
+    metrics.collector('chat_llm_queued', 'LLM calls waiting for a scheduler slot', 'gauge', (),
+                      lambda: [((), chatbot.scheduler.stats()['queued'])])
+    metrics.collector('chat_rejected_total', 'Chats turned away by the scheduler', 'counter', ('reason',),
+                      lambda: [((reason,), chatbot.scheduler.stats()[reason])
+                               for reason in ('rate_limited', 'shed', 'timed_out')])
+    metrics.collector('write_behind_queued', 'Writes waiting in the write-behind queue', 'gauge', (),
+                      lambda: [((), writer.stats()['queued'])])
+    metrics.collector('write_behind_writes_total', 'Write-behind writes by outcome', 'counter', ('outcome',),
+                      lambda: [((outcome,), writer.stats()[outcome]) for outcome in ('written', 'failed', 'overflows')])
+
+_register_stats_metrics()
+
+class UploadRequest(Request):
+    """Request that parses uploaded files straight into the upload folder (see storage.py)"""
+    
+    upload_parts = ()
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        part = storage.upload_stream_factory(total_content_length, content_type, filename, content_length)
+        self.upload_parts = [*self.upload_parts, part]
+        return part
+    
+    def close(self):
+        # Delete partial files from bodies that failed to parse or were never saved
+        super().close()
+        for part in self.upload_parts:
+            part.close()
+
+def create_app():
+    """Create the Flask app, making sure the schema and upload folder exist"""
+    app = Flask(__name__, static_folder='../frontend', static_url_path='')
+    app.request_class = UploadRequest
+    app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+    CORS(app, supports_credentials=True)  # Enable CORS with credentials support
+    
+    # Set secret key for sessions
+    app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+    if TRUSTED_PROXIES:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+    
+    login_manager.init_app(app)
+    metrics.init_app(app)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(main_bp)
+    
+    os.makedirs(storage.UPLOAD_FOLDER, exist_ok=True)
+    init_db()
+    return app
+
+def shutdown():
+    """Flush queued writes, stop background pools, close database connections and save final metrics"""
+    writer.close()
+    resume_parser.shutdown()
+    passwords.shutdown()
+    pool.close_all()
+    metrics.flush(exited=True)
+
+def recover_parse_jobs():
+    """Resubmit resume parse jobs a previous process left unfinished; run once per worker at startup"""
+    try:
+        resubmitted = resume_parser.recover_jobs()
+    except Exception as e:
+        print(f"Resume parse job recovery failed: {e}")
+        return
+    if resubmitted:
+        print(f"Resubmitted {resubmitted} interrupted resume parse job(s)")
+
 # Database initialization
 def init_db():
     """Initialize SQLite database with required tables"""
-    conn = sqlite3.connect('database.db')
-    cursor = conn.cursor()
-    
+    with transaction() as conn:
+        _create_schema(conn.cursor())
+
+def _create_schema(cursor):
+    """Create tables and run column migrations"""
     # Create users table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -61,13 +193,34 @@ def init_db():
             user_id INTEGER NOT NULL,
             filename TEXT NOT NULL,
             file_path TEXT NOT NULL,
-            resume_text TEXT,
             uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             is_current INTEGER DEFAULT 1,
+            content_hash TEXT,
+            resume_digest TEXT,
+            text_hash TEXT,
             FOREIGN KEY (user_id) REFERENCES users(id)
         )
     ''')
     
+    # Add content_hash column if it doesn't exist (migration)
+    try:
+        cursor.execute('ALTER TABLE user_resumes ADD COLUMN content_hash TEXT')
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_resumes_content_hash ON user_resumes(content_hash)')
+    
+    # Add resume_digest column if it doesn't exist (migration)
+    try:
+        cursor.execute('ALTER TABLE user_resumes ADD COLUMN resume_digest TEXT')
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+    
+    # Add text_hash column (extracted text in resume_blobs) if it doesn't exist (migration)
+    try:
+        cursor.execute('ALTER TABLE user_resumes ADD COLUMN text_hash TEXT')
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+    
     # Create assessments table (with migration)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS assessments (
@@ -98,6 +251,7 @@ def init_db():
             response TEXT NOT NULL,
             personality_type TEXT,
             resume_data TEXT,
+            resume_hash TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users(id)
         )
@@ -110,21 +264,141 @@ def init_db():
     except sqlite3.OperationalError:
         pass  # Column already exists
     
-    conn.commit()
-    conn.close()
+    # Add resume_hash column if it doesn't exist (migration)
+    try:
+        cursor.execute('ALTER TABLE chat_sessions ADD COLUMN resume_hash TEXT')
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+    
+    # Conversation memory: recent turns are read newest-first per session
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_sessions_session_id ON chat_sessions(session_id, id)')
+    # Summaries belong to a (session, user) pair like the turns they condense. Tables from
+    # before that were keyed on session_id alone and may hold other users' turns, so they
+    # are dropped (migration); summaries rebuild as conversations continue
+    summary_key = [row[1] for row in cursor.execute('PRAGMA table_info(chat_summaries)') if row[5]]
+    if summary_key == ['session_id']:
+        cursor.execute('DROP TABLE chat_summaries')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_summaries (
+            session_id TEXT NOT NULL,
+            user_id INTEGER,
+            summary TEXT NOT NULL,
+            through_id INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (session_id, user_id),
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    
+    # Create resume_blobs table (deduplicated resume text referenced by chat_sessions and user_resumes)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resume_blobs (
+            content_hash TEXT PRIMARY KEY,
+            content BLOB NOT NULL,
+            compressed INTEGER NOT NULL DEFAULT 0,
+            size INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create resume_parse_jobs table (background text extraction)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resume_parse_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            resume_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            progress REAL NOT NULL DEFAULT 0,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (resume_id) REFERENCES user_resumes(id)
+        )
+    ''')
+    
+    # Add attempts column (runs interrupted by a restart, see resume_parser.recover_jobs) if it doesn't exist (migration)
+    try:
+        cursor.execute('ALTER TABLE resume_parse_jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+    
+    # Resumes that only have the legacy placeholder as text (in the old resume_text column, or
+    # already moved into resume_blobs) have no text yet: clear it and queue them for parsing
+    has_resume_text = 'resume_text' in [row[1] for row in cursor.execute('PRAGMA table_info(user_resumes)')]
+    placeholder_hash = hashlib.sha256(LEGACY_RESUME_PLACEHOLDER.encode('utf-8')).hexdigest()
+    if has_resume_text:
+        placeholders = cursor.execute('SELECT id, user_id, uploaded_at FROM user_resumes WHERE text_hash = ? OR resume_text = ?',
+                                      (placeholder_hash, LEGACY_RESUME_PLACEHOLDER)).fetchall()
+    else:
+        placeholders = cursor.execute('SELECT id, user_id, uploaded_at FROM user_resumes WHERE text_hash = ?',
+                                      (placeholder_hash,)).fetchall()
+    for resume_id, user_id, uploaded_at in placeholders:
+        cursor.execute('UPDATE user_resumes SET text_hash = NULL, resume_digest = NULL WHERE id = ?', (resume_id,))
+        # Dated from the upload, so resume_parser.recover_jobs submits it as a stale job
+        cursor.execute('''
+            INSERT INTO resume_parse_jobs (user_id, resume_id, status, created_at, updated_at)
+            VALUES (?, ?, 'queued', ?, ?)
+        ''', (user_id, resume_id, uploaded_at, uploaded_at))
+    
+    # Move extracted text from the old user_resumes.resume_text column into resume_blobs (migration)
+    if has_resume_text:
+        rows = cursor.execute('SELECT id, resume_text FROM user_resumes WHERE resume_text IS NOT NULL AND resume_text != ?',
+                              (LEGACY_RESUME_PLACEHOLDER,)).fetchall()
+        for resume_id, resume_text in rows:
+            cursor.execute('UPDATE user_resumes SET text_hash = ? WHERE id = ?',
+                           (store_resume_blob(cursor, resume_text), resume_id))
+        try:
+            cursor.execute('ALTER TABLE user_resumes DROP COLUMN resume_text')
+        except sqlite3.OperationalError:
+            # SQLite before 3.35 can't drop columns; leave it empty instead
+            cursor.execute('UPDATE user_resumes SET resume_text = NULL')
+    
+    # Composite indexes for the per-user hot paths: latest assessment, current resume
+    # and the keyset-paginated history endpoints
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_assessments_user_completed
+        ON assessments(user_id, completed_at DESC, id DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_resumes_user_current
+        ON user_resumes(user_id, is_current, uploaded_at, id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_resumes_user_uploaded
+        ON user_resumes(user_id, uploaded_at DESC, id DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_created
+        ON chat_sessions(user_id, created_at DESC, id DESC)
+    ''')
+    
 
-@app.route('/')
+@main_bp.route('/')
 def index():
     """Serve the main page"""
-    return app.send_static_file('index.html')
+    return current_app.send_static_file('index.html')
 
-@app.route('/api/questions', methods=['GET'])
+@main_bp.route('/api/questions', methods=['GET'])
 def get_questions():
     """Get assessment questions"""
-    questions = assessment_engine.get_questions()
-    return jsonify(questions)
+    return questions_payload.response()
+
+@main_bp.route('/api/personality-types', methods=['GET'])
+def get_personality_types():
+    """Get descriptions of every personality type"""
+    return personality_types_payload.response()
 
-@app.route('/api/submit-assessment', methods=['POST'])
+@main_bp.route('/api/personality-types/<name>', methods=['GET'])
+def get_personality_type(name):
+    """Get the description of one personality type"""
+    payload = personality_type_payloads.get(name)
+    if not payload:
+        return jsonify({'success': False, 'error': 'Unknown personality type'}), 404
+    return payload.response()
+
+@main_bp.route('/api/submit-assessment', methods=['POST'])
 def submit_assessment():
     """Submit assessment answers and get results"""
     try:
@@ -133,20 +407,18 @@ def submit_assessment():
         answers = data.get('answers', [])
         
         # Calculate personality type
-        personality_type = assessment_engine.calculate_personality(answers)
+        analysis = assessment_engine.describe_scores(assessment_engine.score_answers(answers))
+        personality_type = analysis['personality_type']
         
         # Get user_id if authenticated
         user_id = current_user.id if current_user.is_authenticated else None
         
-        # Store in database
-        conn = sqlite3.connect('database.db')
-        cursor = conn.cursor()
-        cursor.execute('''
+        # Store in database (batched in the background when write-behind is enabled)
+        row = (session_id, user_id, json.dumps(answers), personality_type)
+        writer.submit(lambda conn: conn.execute('''
             INSERT INTO assessments (session_id, user_id, answers, personality_type)
             VALUES (?, ?, ?, ?)
-        ''', (session_id, user_id, json.dumps(answers), personality_type))
-        conn.commit()
-        conn.close()
+        ''', row))
         
         # Get personalized results
         results = assessment_engine.get_personality_results(personality_type)
@@ -154,13 +426,85 @@ def submit_assessment():
         return jsonify({
             'success': True,
             'personality_type': personality_type,
+            'scores': analysis['scores'],
+            'margins': analysis['margins'],
+            'results': results
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@main_bp.route('/api/assessments/batch-score', methods=['POST'])
+def batch_score_assessments():
+    """Score many assessments in one request (bulk imports from partner schools)"""
+    try:
+        data = request.json
+        assessments = data.get('assessments', [])
+        store = data.get('store', False)
+        
+        if not isinstance(assessments, list) or not assessments:
+            return jsonify({'success': False, 'error': 'assessments must be a non-empty list'}), 400
+        if len(assessments) > MAX_BATCH_ASSESSMENTS:
+            return jsonify({'success': False, 'error': f'At most {MAX_BATCH_ASSESSMENTS} assessments per request'}), 400
+        if store and not current_user.is_authenticated:
+            return jsonify({'success': False, 'error': 'Authentication required to store assessments'}), 401
+        for index, item in enumerate(assessments):
+            error = _assessment_item_error(item)
+            if error:
+                return jsonify({'success': False, 'error': f'assessments[{index}]: {error}', 'index': index}), 400
+        
+        answer_sets = [item.get('answers', []) for item in assessments]
+        scores = assessment_engine.score_answer_sets(answer_sets)
+        personality_types = [assessment_engine.type_names[i] for i in scores.argmax(axis=1)]
+        
+        if store:
+            with transaction() as conn:
+                conn.executemany('''
+                    INSERT INTO assessments (session_id, user_id, answers, personality_type)
+                    VALUES (?, ?, ?, ?)
+                ''', [
+                    (item.get('session_id', 'import'), current_user.id, json.dumps(answers), personality_type)
+                    for item, answers, personality_type in zip(assessments, answer_sets, personality_types)
+                ])
+        
+        results = []
+        for item, row, personality_type in zip(assessments, scores, personality_types):
+            results.append({
+                'session_id': item.get('session_id'),
+                'personality_type': personality_type,
+                'scores': dict(zip(assessment_engine.type_names, row.tolist()))
+            })
+        
+        return jsonify({
+            'success': True,
+            'count': len(results),
             'results': results
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/chat', methods=['POST'])
+def _assessment_item_error(item):
+    """Describe what is wrong with one batch-score item, or return None if it is well-formed"""
+    if not isinstance(item, dict):
+        return 'must be an object'
+    if not isinstance(item.get('session_id', ''), str):
+        return 'session_id must be a string'
+    answers = item.get('answers', [])
+    if not isinstance(answers, list):
+        return 'answers must be a list'
+    for answer in answers:
+        if not isinstance(answer, dict):
+            return 'each answer must be an object'
+        question_id = answer.get('question_id')
+        option_index = answer.get('option_index')
+        if question_id is not None and (isinstance(question_id, bool) or not isinstance(question_id, (int, str))):
+            return 'question_id must be an integer or string'
+        if option_index is not None and (isinstance(option_index, bool) or not isinstance(option_index, int)):
+            return 'option_index must be an integer'
+    return None
+
+@main_bp.route('/api/chat', methods=['POST'])
 def chat():
     """Handle chatbot conversations"""
     try:
@@ -172,98 +516,197 @@ def chat():
         
         # Get user_id if authenticated
         user_id = current_user.id if current_user.is_authenticated else None
-        
-        # If user is authenticated, try to get resume data from their profile
-        if user_id and not resume_data:
-            current_resume = get_current_resume(user_id)
-            if current_resume and current_resume.get('resume_text'):
-                resume_data = current_resume['resume_text']
+        client = client_for(user_id, request.remote_addr)
+        resume_data = chat_service.resolve_resume_data(user_id, resume_data)
+        memory = chat_memory.load_memory(session_id, user_id)
+        # Only chats that reach the LLM count against the rate limit
+        chatbot.check_rate(client, message, personality_type, resume_data, use_cache=not data.get('no_cache', False),
+                           history=memory.history(), summary=memory.summary)
         
         # Get response from chatbot
         response = chatbot.get_career_advice(
             message=message,
             personality_type=personality_type,
-            resume_data=resume_data
+            resume_data=resume_data,
+            use_cache=not data.get('no_cache', False),
+            history=memory.history(),
+            summary=memory.summary,
+            client=client
         )
         
         # Store conversation
-        conn = sqlite3.connect('database.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO chat_sessions (session_id, user_id, message, response, personality_type, resume_data)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (session_id, user_id, message, response, personality_type, resume_data))
-        conn.commit()
-        conn.close()
+        chat_service.save_chat_message(session_id, user_id, message, response, personality_type, resume_data, memory)
         
         return jsonify({
             'success': True,
             'response': response
         })
         
+    except RateLimited as e:
+        return chat_service.rate_limited_response(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/upload-resume', methods=['POST'])
+@main_bp.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Handle chatbot conversations, streaming the response as Server-Sent Events"""
+    try:
+        data = request.json
+        session_id = data.get('session_id', 'guest')
+        message = data.get('message', '')
+        personality_type = data.get('personality_type', '')
+        resume_data = data.get('resume_data', '')
+        
+        user_id = current_user.id if current_user.is_authenticated else None
+        client = client_for(user_id, request.remote_addr)
+        resume_data = chat_service.resolve_resume_data(user_id, resume_data)
+        memory = chat_memory.load_memory(session_id, user_id)
+        chatbot.check_rate(client, message, personality_type, resume_data, use_cache=not data.get('no_cache', False),
+                           history=memory.history(), summary=memory.summary, stream=True)
+    except RateLimited as e:
+        return chat_service.rate_limited_response(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    def generate():
+        chunks = []
+        try:
+            for chunk in chatbot.stream_career_advice(
+                message=message,
+                personality_type=personality_type,
+                resume_data=resume_data,
+                use_cache=not data.get('no_cache', False),
+                history=memory.history(),
+                summary=memory.summary,
+                client=client
+            ):
+                chunks.append(chunk)
+                yield chat_service.sse_event({'token': chunk})
+            
+            # Persist the assembled response once the stream completes
+            response = ''.join(chunks).strip()
+            chat_service.save_chat_message(session_id, user_id, message, response, personality_type, resume_data, memory)
+            yield chat_service.sse_event({'success': True, 'response': response}, event='done')
+        except Exception as e:
+            yield chat_service.sse_event({'success': False, 'error': str(e)}, event='error')
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def _personality_results_json(personality_type):
+    """Pre-rendered get_personality_results() JSON for a personality type"""
+    return personality_result_fragments.get(personality_type, '{}')
+
+@main_bp.route('/api/upload-resume', methods=['POST'])
 @login_required
 def upload_resume():
-    """Handle resume upload and parsing (requires authentication)"""
+    """Handle resume upload and queue it for background parsing (requires authentication)"""
     try:
-        if 'file' not in request.files:
+        # Bodies over the cap are refused up front, or as soon as the limit is crossed when
+        # chunked; the file itself is parsed straight into the upload folder as it arrives
+        request.max_content_length = storage.MAX_UPLOAD_BYTES + storage.MULTIPART_OVERHEAD_BYTES
+        try:
+            files = request.files
+        except (RequestEntityTooLarge, storage.UploadTooLarge):
+            return jsonify({'success': False, 'error': 'File size must be less than 5MB'}), 400
+        
+        if 'file' not in files:
             return jsonify({'success': False, 'error': 'No file uploaded'}), 400
         
-        file = request.files['file']
+        file = files['file']
         if file.filename == '':
             return jsonify({'success': False, 'error': 'No file selected'}), 400
         
         user_id = current_user.id
         
         # Validate file type
-        allowed_extensions = {'.pdf', '.doc', '.docx'}
+        # Only formats resume_parser can extract text from (legacy .doc is not supported)
+        allowed_extensions = {'.pdf', '.docx'}
         file_ext = os.path.splitext(file.filename)[1].lower()
         if file_ext not in allowed_extensions:
-            return jsonify({'success': False, 'error': 'Invalid file type. Please upload PDF, DOC, or DOCX'}), 400
+            return jsonify({'success': False, 'error': 'Invalid file type. Please upload PDF or DOCX'}), 400
         
-        # Validate file size (5MB limit)
-        if len(file.read()) > 5 * 1024 * 1024:
-            return jsonify({'success': False, 'error': 'File size must be less than 5MB'}), 400
+        # Move the already hashed file into content-addressed storage
+        file_path, content_hash = storage.save_upload(file.stream, file_ext)
         
-        file.seek(0)  # Reset file pointer
-        
-        # Save file
-        filename = f"resume_{user_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}"
-        file_path = os.path.join('uploads', filename)
-        file.save(file_path)
-        
-        # For MVP, just store the file and return basic info
-        # In production, you'd parse the resume content here
-        resume_text = "Resume uploaded successfully. Content parsing will be implemented in next iteration."
-        
-        # Mark previous resumes as not current
-        conn = sqlite3.connect('database.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE user_resumes SET is_current = 0 WHERE user_id = ?
-        ''', (user_id,))
+        with transaction() as conn:
+            # Reuse text already extracted from an identical file, by anyone
+            parsed = conn.execute('''
+                SELECT text_hash, resume_digest FROM user_resumes
+                WHERE content_hash = ? AND text_hash IS NOT NULL
+                LIMIT 1
+            ''', (content_hash,)).fetchone()
+            text_hash = parsed['text_hash'] if parsed else None
+            resume_digest = parsed['resume_digest'] if parsed else None
+            
+            # A re-upload of the user's own file becomes current again instead of a new copy
+            existing = conn.execute('''
+                SELECT id FROM user_resumes
+                WHERE user_id = ? AND content_hash = ?
+                ORDER BY id DESC
+                LIMIT 1
+            ''', (user_id, content_hash)).fetchone()
+            
+            if existing:
+                resume_id = existing['id']
+                conn.execute('''
+                    UPDATE user_resumes
+                    SET filename = ?,
+                        text_hash = COALESCE(text_hash, ?), resume_digest = COALESCE(resume_digest, ?)
+                    WHERE id = ?
+                ''', (file.filename, text_hash, resume_digest, resume_id))
+            else:
+                # Store resume in database; text_hash is filled in by the parser if not reused
+                resume_id = conn.execute('''
+                    INSERT INTO user_resumes (user_id, filename, file_path, text_hash, is_current, content_hash, resume_digest)
+                    VALUES (?, ?, ?, ?, 0, ?, ?)
+                ''', (user_id, file.filename, file_path, text_hash, content_hash, resume_digest)).lastrowid
+            
+            # Text already on hand makes the upload current now; otherwise the previous
+            # resume stays current until the parse job succeeds
+            if text_hash is not None:
+                resume_parser.make_current(conn, resume_id)
+            
+            status = 'completed' if text_hash is not None else 'queued'
+            job_id = conn.execute('''
+                INSERT INTO resume_parse_jobs (user_id, resume_id, status, progress) VALUES (?, ?, ?, ?)
+            ''', (user_id, resume_id, status, 1 if text_hash is not None else 0)).lastrowid
         
-        # Store resume in database
-        cursor.execute('''
-            INSERT INTO user_resumes (user_id, filename, file_path, resume_text, is_current)
-            VALUES (?, ?, ?, ?, 1)
-        ''', (user_id, file.filename, file_path, resume_text))
-        conn.commit()
-        conn.close()
+        # Parse in the background so the request returns immediately
+        if text_hash is None:
+            resume_parser.submit_parse_job(job_id, resume_id, file_path)
         
         return jsonify({
             'success': True,
             'filename': file.filename,
-            'resume_text': resume_text
-        })
+            'resume_id': resume_id,
+            'job_id': job_id,
+            'status': status,
+            'deduplicated': text_hash is not None
+        }), 202
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/user/profile', methods=['GET'])
+@main_bp.route('/api/resume-jobs/<int:job_id>', methods=['GET'])
+@login_required
+def get_resume_job_status(job_id):
+    """Get the progress of a background resume parsing job"""
+    try:
+        job = get_resume_job(job_id, current_user.id)
+        if not job:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        return jsonify({
+            'success': True,
+            'job': job
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@main_bp.route('/api/user/profile', methods=['GET'])
 @login_required
 def get_profile():
     """Get user profile"""
@@ -271,29 +714,25 @@ def get_profile():
         user = current_user.to_dict()
         
         # Get latest assessment
-        assessments = get_user_assessments(current_user.id)
-        latest_assessment = assessments[0] if assessments else None
+        latest_assessment = get_latest_assessment(current_user.id)
         
         # Get current resume
         current_resume = get_current_resume(current_user.id)
         
         # Get personality type from latest assessment
         personality_type = latest_assessment['personality_type'] if latest_assessment else None
-        personality_results = None
-        if personality_type:
-            personality_results = assessment_engine.get_personality_results(personality_type)
+        personality_results = _personality_results_json(personality_type) if personality_type else 'null'
         
-        return jsonify({
+        return json_response(dumps_with_fragment({
             'success': True,
             'user': user,
             'latest_assessment': latest_assessment,
-            'personality_results': personality_results,
             'current_resume': current_resume
-        })
+        }, 'personality_results', personality_results))
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/user/profile', methods=['PUT'])
+@main_bp.route('/api/user/profile', methods=['PUT'])
 @login_required
 def update_profile():
     """Update user profile"""
@@ -321,48 +760,126 @@ def update_profile():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/user/assessment-history', methods=['GET'])
+@main_bp.route('/api/user/assessment-history', methods=['GET'])
 @login_required
 def get_assessment_history():
-    """Get user's assessment history"""
+    """Get one page of the user's assessment history (?limit=&cursor=&include_answers=1)"""
     try:
-        assessments = get_user_assessments(current_user.id)
+        limit, cursor = _page_args()
+        assessments, next_cursor = get_user_assessments_page(
+            current_user.id, limit, cursor, include_answers=_flag_arg('include_answers')
+        )
         
-        # Enrich with personality results
+        # Enrich with pre-rendered personality results
         enriched_assessments = []
         for assessment in assessments:
             personality_type = assessment['personality_type']
             if personality_type:
-                results = assessment_engine.get_personality_results(personality_type)
-                assessment['results'] = results
-            enriched_assessments.append(assessment)
+                enriched_assessments.append(
+                    dumps_with_fragment(assessment, 'results', _personality_results_json(personality_type))
+                )
+            else:
+                enriched_assessments.append(dumps(assessment))
         
+        return json_response(dumps_with_fragment(
+            {'success': True, 'next_cursor': next_cursor}, 'assessments', '[' + ','.join(enriched_assessments) + ']'
+        ))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@main_bp.route('/api/user/resumes', methods=['GET'])
+@login_required
+def get_resumes():
+    """Get one page of the user's uploaded resumes (?limit=&cursor=&include_text=1)"""
+    try:
+        limit, cursor = _page_args()
+        resumes, next_cursor = get_user_resumes_page(
+            current_user.id, limit, cursor, include_text=_flag_arg('include_text')
+        )
         return jsonify({
             'success': True,
-            'assessments': enriched_assessments
+            'resumes': resumes,
+            'next_cursor': next_cursor
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/user/resumes', methods=['GET'])
+@main_bp.route('/api/user/chat-history', methods=['GET'])
 @login_required
-def get_resumes():
-    """Get user's uploaded resumes"""
+def get_chat_history():
+    """Get one page of the user's chat messages (?limit=&cursor=&session_id=)"""
     try:
-        resumes = get_user_resumes(current_user.id)
+        limit, cursor = _page_args()
+        chats, next_cursor = get_user_chats_page(
+            current_user.id, limit, cursor, session_id=request.args.get('session_id')
+        )
         return jsonify({
             'success': True,
-            'resumes': resumes
+            'chats': chats,
+            'next_cursor': next_cursor
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def diagnostics_only(view):
+    """Restrict a route to DIAGNOSTICS_TOKEN bearers, or to loopback/private addresses when no token is set"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if DIAGNOSTICS_TOKEN:
+            supplied = request.headers.get('Authorization', '').encode()
+            allowed = hmac.compare_digest(supplied, f'Bearer {DIAGNOSTICS_TOKEN}'.encode())
+        else:
+            try:
+                address = ipaddress.ip_address(request.remote_addr or '')
+                allowed = address.is_loopback or address.is_private
+            except ValueError:
+                allowed = False
+        if not allowed:
+            return jsonify({'success': False, 'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@main_bp.route('/api/cache-stats', methods=['GET'])
+@diagnostics_only
+def get_cache_stats():
+    """Hit rates and sizes of the in-process caches, and LLM provider counters"""
+    return jsonify({
+        'success': True,
+        'users': user_cache.stats(),
+        'chat_responses': chatbot.response_cache.stats(),
+        'resume_digests': digest_cache.stats(),
+        'chat_in_flight': chatbot.in_flight.stats(),
+        'llm_providers': chatbot.providers.stats(),
+        'llm_circuit': chatbot.breaker.stats(),
+        'chat_scheduler': chatbot.scheduler.stats()
+    })
+
+@main_bp.route('/metrics', methods=['GET'])
+@diagnostics_only
+def get_metrics():
+    """Prometheus metrics, merged across the gunicorn workers"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+def _page_args():
+    """Read ?limit= and ?cursor= for keyset-paginated endpoints"""
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    return limit, request.args.get('cursor') or None
+
+def _flag_arg(name):
+    """Read a boolean query-string flag"""
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
 if __name__ == '__main__':
-    # Create uploads directory if it doesn't exist
-    os.makedirs('uploads', exist_ok=True)
-    
-    # Initialize database
-    init_db()
+    # Development server; production runs gunicorn with wsgi.py (see gunicorn.conf.py)
+    app = create_app()
+    chatbot.start_warm_up()
+    recover_parse_jobs()
     
     # Get port from environment variable (Railway provides this) or default to 5000
     port = int(os.getenv('PORT', 5000))
@@ -0,0 +1,200 @@
+"""
+ASGI entry point with async chat routes
+/api/chat and /api/chat/stream run on the event loop and await the LLM through
+the providers' async clients, so one process holds hundreds of concurrent chats
+instead of one per thread. Every other route is the unchanged Flask app, served
+from a thread pool through a WSGI adapter. Database work for the chat routes
+(user lookup, resume digest, chat memory, saving the exchange) runs in threads.
+
+Usage: gunicorn -c gunicorn.conf.py -k uvicorn_worker.UvicornWorker asgi:app
+   or: uvicorn asgi:app --port 5000
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from flask_login import current_user
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as flask_module
+import chat_memory
+import chat_service
+import metrics
+from app import chatbot, create_app
+from scheduler import RateLimited, client_for, forwarded_addr
+
+# Threads for blocking work: the wrapped Flask routes, and the chat routes' database calls
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 16))
+
+flask_app = create_app()
+
+
+def _prepare_chat(headers, client_addr, data, stream):
+    """
+    Resolve the user, resume digest and chat memory for a chat request, and rate limit it
+
+    Runs in a thread inside a Flask request context built from the ASGI request's
+    headers, so Flask-Login reads the same session and remember cookies (and
+    applies the same session protection) as the sync routes.
+    """
+    with flask_app.test_request_context('/api/chat', method='POST', headers=headers,
+                                        environ_base={'REMOTE_ADDR': client_addr}):
+        user_id = current_user.id if current_user.is_authenticated else None
+    client = client_for(user_id, client_addr)
+    resume_data = chat_service.resolve_resume_data(user_id, data.get('resume_data', ''))
+    memory = chat_memory.load_memory(data.get('session_id', 'guest'), user_id)
+    chatbot.check_rate(client, data.get('message', ''), data.get('personality_type', ''), resume_data,
+                       use_cache=not data.get('no_cache', False), history=memory.history(),
+                       summary=memory.summary, stream=stream)
+    return user_id, client, resume_data, memory
+
+
+async def _read_chat_request(request, stream=False):
+    """Parse the JSON body and prepare the prompt context off the event loop"""
+    data = await request.json()
+    # Resolve the guest address the way the Flask app's ProxyFix does
+    client_addr = forwarded_addr(
+        request.client.host if request.client else None,
+        request.headers.get('x-forwarded-for'),
+        flask_module.TRUSTED_PROXIES
+    )
+    user_id, client, resume_data, memory = await asyncio.to_thread(
+        _prepare_chat, list(request.headers.items()), client_addr, data, stream
+    )
+    return data, user_id, client, resume_data, memory
+
+
+async def chat(request):
+    """Async /api/chat"""
+    try:
+        data, user_id, client, resume_data, memory = await _read_chat_request(request)
+        session_id = data.get('session_id', 'guest')
+        message = data.get('message', '')
+        personality_type = data.get('personality_type', '')
+
+        response = await chatbot.aget_career_advice(
+            message=message,
+            personality_type=personality_type,
+            resume_data=resume_data,
+            use_cache=not data.get('no_cache', False),
+            history=memory.history(),
+            summary=memory.summary,
+            client=client
+        )
+
+        await asyncio.to_thread(
+            chat_service.save_chat_message,
+            session_id, user_id, message, response, personality_type, resume_data, memory
+        )
+        return JSONResponse({'success': True, 'response': response})
+
+    except RateLimited as e:
+        return JSONResponse(*chat_service.rate_limited_response(e))
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+
+
+async def chat_stream(request):
+    """Async /api/chat/stream, sending the response as Server-Sent Events"""
+    try:
+        data, user_id, client, resume_data, memory = await _read_chat_request(request, stream=True)
+    except RateLimited as e:
+        return JSONResponse(*chat_service.rate_limited_response(e))
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+    session_id = data.get('session_id', 'guest')
+    message = data.get('message', '')
+    personality_type = data.get('personality_type', '')
+
+    async def generate():
+        chunks = []
+        try:
+            async for chunk in chatbot.astream_career_advice(
+                message=message,
+                personality_type=personality_type,
+                resume_data=resume_data,
+                use_cache=not data.get('no_cache', False),
+                history=memory.history(),
+                summary=memory.summary,
+                client=client
+            ):
+                chunks.append(chunk)
+                yield chat_service.sse_event({'token': chunk})
+
+            response = ''.join(chunks).strip()
+            await asyncio.to_thread(
+                chat_service.save_chat_message,
+                session_id, user_id, message, response, personality_type, resume_data, memory
+            )
+            yield chat_service.sse_event({'success': True, 'response': response}, event='done')
+        except Exception as e:
+            yield chat_service.sse_event({'success': False, 'error': str(e)}, event='error')
+
+    return StreamingResponse(
+        generate(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@asynccontextmanager
+async def lifespan(app):
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(ASGI_THREADS, thread_name_prefix='asgi')
+    )
+    chatbot.start_warm_up()
+    await asyncio.to_thread(flask_module.recover_parse_jobs)
+    yield
+    await asyncio.to_thread(flask_module.shutdown)
+
+
+class RequestMetrics:
+    """Records an async route in the same metrics metrics.init_app records for the Flask routes"""
+
+    def __init__(self, app, route):
+        self.app = app
+        self.route = route
+
+    async def __call__(self, scope, receive, send):
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.http_request_seconds.observe(time.perf_counter() - started, scope['method'], self.route)
+            metrics.http_requests_total.inc(scope['method'], self.route, str(status))
+
+
+def chat_middleware(route):
+    return [
+        Middleware(RequestMetrics, route=route),
+        # Same policy as the Flask app's CORS(supports_credentials=True): reflect the origin, allow cookies
+        Middleware(CORSMiddleware, allow_origin_regex='.*', allow_credentials=True,
+                   allow_methods=['POST'], allow_headers=['*'])
+    ]
+
+
+app = Starlette(
+    routes=[
+        Route('/api/chat', chat, methods=['POST', 'OPTIONS'], middleware=chat_middleware('/api/chat')),
+        Route('/api/chat/stream', chat_stream, methods=['POST', 'OPTIONS'],
+              middleware=chat_middleware('/api/chat/stream')),
+        Mount('/', WSGIMiddleware(flask_app, workers=ASGI_THREADS))
+    ],
+    lifespan=lifespan
+)
@@ -3,10 +3,35 @@ Assessment Engine for Career Personality Analysis
 Handles questions, scoring, and personality type determination
 """
 
+import numpy as np
+
 class AssessmentEngine:
     def __init__(self):
         self.questions = self._load_questions()
         self.personality_types = self._load_personality_types()
+        self._compile_weights()
+    
+    def _compile_weights(self):
+        """
+        Compile the question bank into a dense weight array for vectorized scoring
+        
+        Builds self.weights with shape (questions, max options, personality types),
+        zero-padded for questions with fewer options, plus a question id -> row index
+        and the number of options per row for validating answers. Scoring gathers
+        from a (questions * max options, types) view so one answer is one flat row.
+        """
+        self.type_names = list(self.personality_types)
+        self.question_index = {q["id"]: row for row, q in enumerate(self.questions)}
+        self.option_counts = [len(q["options"]) for q in self.questions]
+        
+        max_options = max(self.option_counts, default=0)
+        self.weights = np.zeros((len(self.questions), max_options, len(self.type_names)), dtype=np.int64)
+        for row, q in enumerate(self.questions):
+            for col, option in enumerate(q["options"]):
+                for personality, weight in option["weights"].items():
+                    self.weights[row, col, self.type_names.index(personality)] = weight
+        self._flat_weights = self.weights.reshape(-1, len(self.type_names))
+        self._max_options = max_options
     
     def _load_questions(self):
         """Load assessment questions with scoring weights"""
@@ -202,21 +227,77 @@ class AssessmentEngine:
     
     def calculate_personality(self, answers):
         """Calculate personality type based on answers"""
-        scores = {"Analyst": 0, "Leader": 0, "Collaborator": 0}
+        scores = self.score_answers(answers)
         
+        # Return the personality type with the highest score (first type wins ties)
+        return self.type_names[int(scores.argmax())]
+    
+    def score_answers(self, answers):
+        """Return the score vector (one entry per personality type) for a list of answers"""
+        return self._flat_weights.take(self._encode_answers(answers), axis=0).sum(axis=0)
+    
+    def analyze_answers(self, answers):
+        """Score answers and report the full breakdown (see describe_scores)"""
+        return self.describe_scores(self.score_answers(answers))
+    
+    def describe_scores(self, scores):
+        """
+        Break down a score_answers vector
+        
+        Returns:
+            dict: personality_type (the highest score, first type wins ties), scores per type,
+                  and margins (how far each type trails the winner)
+        """
+        # Plain ints are much cheaper to compare and serialize than numpy scalars
+        values = scores.tolist()
+        top = max(values)
+        return {
+            "personality_type": self.type_names[values.index(top)],
+            "scores": dict(zip(self.type_names, values)),
+            "margins": {name: top - value for name, value in zip(self.type_names, values)}
+        }
+    
+    def score_answer_sets(self, answer_sets):
+        """
+        Score many answer lists at once
+        
+        Returns:
+            numpy.ndarray: (len(answer_sets), personality types) score matrix
+        """
+        indices = []
+        owners = []
+        for position, answers in enumerate(answer_sets):
+            for index in self._iter_answer_indices(answers):
+                indices.append(index)
+                owners.append(position)
+        
+        # Gather every selected option row once, then sum rows per answer set
+        gathered = self._flat_weights.take(np.array(indices, dtype=np.intp), axis=0)
+        owners = np.array(owners, dtype=np.intp)
+        scores = np.empty((len(answer_sets), len(self.type_names)), dtype=np.int64)
+        for column in range(len(self.type_names)):
+            scores[:, column] = np.bincount(owners, weights=gathered[:, column], minlength=len(answer_sets))
+        return scores
+    
+    def calculate_personalities(self, answer_sets):
+        """Calculate the personality type for each of many answer lists"""
+        winners = self.score_answer_sets(answer_sets).argmax(axis=1)
+        return [self.type_names[i] for i in winners]
+    
+    def _encode_answers(self, answers):
+        """Map answers to flat weight-row indices, dropping unknown questions and options"""
+        return np.array(list(self._iter_answer_indices(answers)), dtype=np.intp)
+    
+    def _iter_answer_indices(self, answers):
+        """Yield the flat weight-row index of each valid answer"""
         for answer in answers:
             question_id = answer.get("question_id")
             option_index = answer.get("option_index")
             
             if question_id and option_index is not None:
-                question = next((q for q in self.questions if q["id"] == question_id), None)
-                if question and 0 <= option_index < len(question["options"]):
-                    option = question["options"][option_index]
-                    for personality, weight in option["weights"].items():
-                        scores[personality] += weight
-        
-        # Return the personality type with the highest score
-        return max(scores, key=scores.get)
+                row = self.question_index.get(question_id)
+                if row is not None and 0 <= option_index < self.option_counts[row]:
+                    yield row * self._max_options + option_index
     
     def get_personality_results(self, personality_type):
         """Get detailed results for a personality type"""
@@ -5,7 +5,8 @@ Authentication routes and utilities
 import re
 from flask import Blueprint, request, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
-from models import get_user_by_email, create_user, verify_password, update_user
+from models import get_user_by_email, create_user, verify_password, update_user, upgrade_password_hash
+from passwords import HasherBusy
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -66,6 +67,8 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except HasherBusy as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -91,6 +94,9 @@ def login():
         if not verify_password(user, password):
             return jsonify({'success': False, 'error': 'Invalid email or password'}), 401
         
+        # Move hashes made with older parameters to the current ones
+        upgrade_password_hash(user, password)
+        
         # Log in the user
         login_user(user, remember=remember)
         
@@ -100,6 +106,8 @@ def login():
             'user': user.to_dict()
         })
         
+    except HasherBusy as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -0,0 +1,121 @@
+"""
+Database layer benchmark
+Compares the old connect-per-call pattern against the pooled WAL connection layer
+using the statement mix of the hot routes (load_user, submit_assessment, chat).
+
+Usage: python benchmarks/bench_db.py [--threads 8] [--requests 4000]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import ConnectionPool  # noqa: E402
+
+SCHEMA = '''
+    CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL, first_name TEXT, last_name TEXT, preferences TEXT);
+    CREATE TABLE assessments (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,
+        user_id INTEGER, answers TEXT NOT NULL, personality_type TEXT,
+        completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    CREATE TABLE chat_sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,
+        user_id INTEGER, message TEXT NOT NULL, response TEXT NOT NULL, personality_type TEXT,
+        resume_data TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+'''
+
+ANSWERS = json.dumps([{'question_id': i, 'option_index': i % 3} for i in range(1, 9)])
+
+
+def setup_database(path):
+    """Create the schema and a handful of users"""
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        'INSERT INTO users (email, password_hash, preferences) VALUES (?, ?, ?)',
+        [(f'user{i}@example.com', 'x' * 100, '{}') for i in range(100)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_request(path, i):
+    """One request the way the routes used to do it: a fresh connection per statement"""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute('SELECT * FROM users WHERE id = ?', (i % 100 + 1,)).fetchone()
+    conn.close()
+
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    if i % 2:
+        cursor.execute('INSERT INTO assessments (session_id, user_id, answers, personality_type) VALUES (?, ?, ?, ?)',
+                       ('bench', i % 100 + 1, ANSWERS, 'Analyst'))
+    else:
+        cursor.execute('INSERT INTO chat_sessions (session_id, user_id, message, response, personality_type, resume_data) '
+                       'VALUES (?, ?, ?, ?, ?, ?)', ('bench', i % 100 + 1, 'hello', 'world', 'Leader', ''))
+    conn.commit()
+    conn.close()
+
+
+def pooled_request(pool, i):
+    """The same request through the pooled connection layer"""
+    conn = pool.acquire()
+    try:
+        conn.execute('SELECT * FROM users WHERE id = ?', (i % 100 + 1,)).fetchone()
+    finally:
+        pool.release(conn)
+
+    conn = pool.acquire()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        if i % 2:
+            conn.execute('INSERT INTO assessments (session_id, user_id, answers, personality_type) VALUES (?, ?, ?, ?)',
+                         ('bench', i % 100 + 1, ANSWERS, 'Analyst'))
+        else:
+            conn.execute('INSERT INTO chat_sessions (session_id, user_id, message, response, personality_type, resume_data) '
+                         'VALUES (?, ?, ?, ?, ?, ?)', ('bench', i % 100 + 1, 'hello', 'world', 'Leader', ''))
+        conn.commit()
+    finally:
+        pool.release(conn)
+
+
+def run(label, fn, threads, requests):
+    """Drive fn from a thread pool and report requests/sec"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(fn, range(requests)))
+    elapsed = time.perf_counter() - start
+    rate = requests / elapsed
+    print(f'{label:<10} {requests} requests in {elapsed:.2f}s  ->  {rate:,.0f} req/s')
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=4000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        pooled_path = os.path.join(tmp, 'pooled.db')
+        setup_database(legacy_path)
+        setup_database(pooled_path)
+
+        pool = ConnectionPool(pooled_path, size=args.threads)
+        before = run('before', lambda i: legacy_request(legacy_path, i), args.threads, args.requests)
+        after = run('after', lambda i: pooled_request(pool, i), args.threads, args.requests)
+        pool.close_all()
+
+    print(f'speedup    {after / before:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Login throughput benchmark
+Fires concurrent logins at the app while a second client polls a cheap endpoint,
+once with inline hashing and once with the hashing process pool, and reports
+login throughput alongside the latency the other endpoint saw meanwhile.
+
+Usage: python benchmarks/bench_login.py [--threads 16] [--logins 200] [--hash-workers 2]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'benchmark-password'
+USERS = 50
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))] if samples else 0.0
+
+
+def run_mode(threads, logins):
+    """Run one configuration in this process and print its results as JSON"""
+    sys.path.insert(0, BACKEND_DIR)
+    import app as app_module
+    import passwords
+    from db import transaction
+
+    flask_app = app_module.create_app()
+    password_hash = passwords.hash_password(PASSWORD)
+    with transaction() as conn:
+        conn.executemany(
+            'INSERT INTO users (email, password_hash, preferences) VALUES (?, ?, ?)',
+            [(f'user{i}@example.com', password_hash, '{}') for i in range(USERS)]
+        )
+
+    local = threading.local()
+
+    def login(i):
+        if not hasattr(local, 'client'):
+            local.client = flask_app.test_client()
+        start = time.perf_counter()
+        status = local.client.post('/api/login', json={
+            'email': f'user{i % USERS}@example.com', 'password': PASSWORD
+        }).status_code
+        return status, time.perf_counter() - start
+
+    # Warm the pool so worker start-up is not counted
+    login(0)
+
+    done = threading.Event()
+    other_latencies = []
+
+    def poll_other_endpoint():
+        client = flask_app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get('/api/personality-types')
+            other_latencies.append(time.perf_counter() - start)
+
+    poller = threading.Thread(target=poll_other_endpoint)
+    poller.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    poller.join()
+    passwords.shutdown()
+
+    latencies = [latency for status, latency in results if status == 200]
+    print(json.dumps({
+        'logins_per_s': len(latencies) / elapsed,
+        'failed': len(results) - len(latencies),
+        'login_p50_ms': percentile(latencies, 50) * 1000,
+        'login_p95_ms': percentile(latencies, 95) * 1000,
+        'other_p95_ms': percentile(other_latencies, 95) * 1000,
+        'other_requests': len(other_latencies)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput benchmark')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--hash-workers', type=int, default=2)
+    parser.add_argument('--run-mode', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        run_mode(args.threads, args.logins)
+        return
+
+    print(f"{'hashing':<16} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'other p95 ms':>13} {'other reqs':>11}")
+    for label, workers in (('inline', 0), (f'pool ({args.hash_workers})', args.hash_workers)):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_PATH=os.path.join(tmp, 'bench.db'),
+                       PASSWORD_HASH_WORKERS=str(workers), OPENAI_API_KEY='')
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run-mode',
+                 '--threads', str(args.threads), '--logins', str(args.logins)],
+                env=env, cwd=tmp, capture_output=True, text=True, check=True
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{label:<16} {result['logins_per_s']:>9.1f} {result['login_p50_ms']:>8.1f} "
+              f"{result['login_p95_ms']:>8.1f} {result['other_p95_ms']:>13.1f} {result['other_requests']:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Resume digest prompt-size measurement
+Formats the chatbot's career prompt with the full resume text and with its digest
+and reports prompt tokens for each.
+
+Usage: python benchmarks/bench_resume_digest.py [resume.pdf|resume.docx|resume.txt ...] [--budget 400]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import CareerChatbot  # noqa: E402
+from resume_digest import DIGEST_TOKEN_BUDGET, build_digest, count_tokens  # noqa: E402
+from resume_parser import extract_text  # noqa: E402
+
+QUESTION = "What careers fit me?"
+
+
+def synthetic_resume(jobs):
+    """A plausible resume with the given number of positions"""
+    lines = ["Jane Doe", "Senior Data Analyst", "jane.doe@example.com | +1 (555) 010-2030 | linkedin.com/in/janedoe",
+             "Summary", "Analyst with a decade of experience turning messy data into decisions.",
+             "Skills", "Python, SQL, Tableau, dbt, Airflow, statistics, A/B testing, stakeholder management"]
+    lines.append("Experience")
+    for job in range(jobs):
+        lines.append(f"Analyst {job}, Company {job} ({2024 - 2 * job - 2}-{2024 - 2 * job})")
+        for bullet in range(6):
+            lines.append(f"- Built reporting pipeline {bullet} that cut turnaround time by {10 + bullet}% for team {job}")
+    lines += ["Education", "BSc Statistics, State University", "Projects", "Open-source contributor to data tooling"]
+    return "\n".join(lines)
+
+
+def prompt_tokens(chatbot, resume_data):
+    """Tokens in the fully formatted career prompt"""
+    messages = chatbot.career_prompt.format_messages(**chatbot._build_inputs(QUESTION, "Analyst", resume_data))
+    return sum(count_tokens(message.content) for message in messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--budget", type=int, default=DIGEST_TOKEN_BUDGET)
+    args = parser.parse_args()
+
+    if args.files:
+        samples = []
+        for path in args.files:
+            text = open(path).read() if path.endswith(".txt") else extract_text(path)
+            samples.append((os.path.basename(path), text))
+    else:
+        samples = [(f"synthetic, {jobs} jobs", synthetic_resume(jobs)) for jobs in (1, 3, 6, 12)]
+
+    chatbot = CareerChatbot()
+    print(f"{'resume':<24} {'full prompt':>12} {'digest prompt':>14} {'reduction':>10}")
+    for name, text in samples:
+        full = prompt_tokens(chatbot, text)
+        digest = prompt_tokens(chatbot, build_digest(text, args.budget))
+        print(f"{name:<24} {full:>12} {digest:>14} {1 - digest / full:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
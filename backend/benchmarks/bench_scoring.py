@@ -0,0 +1,79 @@
+"""
+Assessment scoring micro-benchmark
+Compares the original per-answer scan over the question list with the
+compiled weight-array scoring path in AssessmentEngine.
+
+Usage: python benchmarks/bench_scoring.py [--iterations 20000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assessment_engine import AssessmentEngine  # noqa: E402
+
+
+def legacy_calculate_personality(questions, answers):
+    """The scoring loop as it was before the weight array was introduced"""
+    scores = {"Analyst": 0, "Leader": 0, "Collaborator": 0}
+    for answer in answers:
+        question_id = answer.get("question_id")
+        option_index = answer.get("option_index")
+        if question_id and option_index is not None:
+            question = next((q for q in questions if q["id"] == question_id), None)
+            if question and 0 <= option_index < len(question["options"]):
+                option = question["options"][option_index]
+                for personality, weight in option["weights"].items():
+                    scores[personality] += weight
+    return max(scores, key=scores.get)
+
+
+def random_answers(engine, rng):
+    """One complete answer set"""
+    return [
+        {"question_id": q["id"], "option_index": rng.randrange(len(q["options"]))}
+        for q in engine.questions
+    ]
+
+
+def report(label, seconds, iterations):
+    print(f"{label:<24} {seconds / iterations * 1e6:8.2f} us/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    engine = AssessmentEngine()
+    rng = random.Random(42)
+    answer_sets = [random_answers(engine, rng) for _ in range(256)]
+
+    # Both paths must agree before timing them
+    for answers in answer_sets:
+        assert legacy_calculate_personality(engine.questions, answers) == engine.calculate_personality(answers)
+        assert engine.analyze_answers(answers)["personality_type"] == engine.calculate_personality(answers)
+    assert engine.calculate_personalities(answer_sets) == [engine.calculate_personality(a) for a in answer_sets]
+
+    cycle = iter(answer_sets * (args.iterations // len(answer_sets) + 1))
+    legacy = timeit.timeit(lambda: legacy_calculate_personality(engine.questions, next(cycle)), number=args.iterations)
+    cycle = iter(answer_sets * (args.iterations // len(answer_sets) + 1))
+    compiled = timeit.timeit(lambda: engine.calculate_personality(next(cycle)), number=args.iterations)
+    cycle = iter(answer_sets * (args.iterations // len(answer_sets) + 1))
+    analyzed = timeit.timeit(lambda: engine.analyze_answers(next(cycle)), number=args.iterations)
+
+    batch_rounds = max(1, args.iterations // len(answer_sets))
+    batched = timeit.timeit(lambda: engine.calculate_personalities(answer_sets), number=batch_rounds)
+
+    report("legacy loop", legacy, args.iterations)
+    report("compiled argmax", compiled, args.iterations)
+    report("compiled full analysis", analyzed, args.iterations)
+    report("compiled batch (per set)", batched, batch_rounds * len(answer_sets))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Startup import budget check
+Imports the app in a fresh interpreter with -X importtime, prints the slowest
+modules and fails if the import exceeds the budget or pulls in a dependency
+that should only load on first use (LangChain, the OpenAI SDK).
+
+Usage: python benchmarks/check_import_time.py [--budget-ms 800] [--top 15]   (exit status 1 on regression)
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Top-level packages that must not be imported at startup
+DEFERRED_PACKAGES = ('langchain', 'langchain_core', 'langchain_openai', 'openai', 'tiktoken', 'pypdf', 'docx')
+
+
+def measure(module):
+    """Import module in a fresh interpreter and return (name, self_us, cumulative_us) rows"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_PATH=os.path.join(tmp, 'import.db'), PYTHONDONTWRITEBYTECODE='1')
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+        )
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup import budget check')
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('IMPORT_BUDGET_MS', 800)))
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    total_ms = next(cumulative for name, _, cumulative in rows if name == args.module) / 1000
+
+    print(f"{'module':<48} {'self ms':>8} {'cumul ms':>9}")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{name:<48} {self_us / 1000:>8.1f} {cumulative_us / 1000:>9.1f}")
+
+    failures = []
+    deferred = sorted({name for name, _, _ in rows if name.split('.')[0] in DEFERRED_PACKAGES})
+    if deferred:
+        failures.append(f"deferred packages imported at startup: {', '.join(deferred[:10])}")
+    if total_ms > args.budget_ms:
+        failures.append(f"import {args.module} took {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+
+    print(f"\nimport {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
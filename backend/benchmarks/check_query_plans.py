@@ -0,0 +1,85 @@
+"""
+Query plan regression check
+Runs the per-request database helpers against a fresh schema, captures the SQL
+they execute and fails if any of it falls back to a table scan or a temporary
+sort instead of using an index.
+
+Usage: python benchmarks/check_query_plans.py   (exit status 1 on regression)
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_PATH'] = os.path.join(_tmp.name, 'plans.db')
+
+import db  # noqa: E402
+
+captured = []
+_connect = db.ConnectionPool._connect
+
+
+def _traced_connect(self):
+    conn = _connect(self)
+    conn.set_trace_callback(captured.append)
+    return conn
+
+
+db.ConnectionPool._connect = _traced_connect
+
+import app as app_module  # noqa: E402
+import chat_memory  # noqa: E402
+import models  # noqa: E402
+
+# Plan fragments that mean a query is no longer index-driven
+BAD_PLAN_STEPS = ('SCAN ', 'USE TEMP B-TREE')
+
+
+def exercise_hot_paths():
+    """Call every helper that runs on a per-request hot path"""
+    user = models.create_user('plans@example.com', 'password123')
+    with db.transaction() as conn:
+        conn.execute("INSERT INTO assessments (session_id, user_id, answers, personality_type) VALUES ('s', ?, '[]', 'Analyst')", (user.id,))
+        conn.execute("INSERT INTO user_resumes (user_id, filename, file_path) VALUES (?, 'cv.pdf', 'cv.pdf')", (user.id,))
+        conn.execute("INSERT INTO chat_sessions (session_id, user_id, message, response) VALUES ('s', ?, 'm', 'r')", (user.id,))
+
+    captured.clear()
+    models.get_user_by_id(user.id)
+    models.get_user_by_email(user.email)
+    models.get_latest_assessment(user.id)
+    models.get_current_resume(user.id)
+    for page in (models.get_user_assessments_page, models.get_user_resumes_page, models.get_user_chats_page):
+        _, cursor = page(user.id, limit=1)
+        page(user.id, limit=1, cursor=models.encode_cursor('2100-01-01 00:00:00', 1))
+    chat_memory.load_memory('s', user.id)
+
+
+def main():
+    app_module.create_app()
+    exercise_hot_paths()
+
+    statements = [sql for sql in dict.fromkeys(captured) if sql.lstrip().upper().startswith('SELECT')]
+    failures = 0
+    conn = db.pool.acquire()
+    try:
+        for sql in statements:
+            plan = [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+            bad = [step for step in plan if step.startswith(BAD_PLAN_STEPS)]
+            status = 'FAIL' if bad else 'ok'
+            failures += bool(bad)
+            print(f"[{status}] {' '.join(sql.split())}")
+            for step in plan:
+                print(f"         {step}")
+    finally:
+        db.pool.release(conn)
+
+    print(f"\n{len(statements)} queries checked, {failures} regressions")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Mid-stream error check
+Serves /api/chat/stream from the Flask app and from asgi.py with a provider that
+sends a few tokens and then fails, and checks that both routes end the stream
+with an error event instead of a done event, don't save the partial answer, and
+count the broken stream as a failure in the LLM circuit breaker.
+
+Usage: python benchmarks/check_stream_errors.py   (exit status 1 on failure)
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+TOKENS = ['Start ', 'by ', 'listing ']
+
+
+class BrokenStreamPool:
+    """Provider pool whose streams fail after a few tokens"""
+
+    available = True
+
+    def stream(self, messages):
+        yield from TOKENS
+        raise ConnectionError('Connection reset mid-stream')
+
+    async def astream(self, messages):
+        for token in TOKENS:
+            yield token
+        raise ConnectionError('Connection reset mid-stream')
+
+    def stats(self):
+        return {}
+
+
+def parse_events(body):
+    """Return (event, payload) pairs from a Server-Sent Events body"""
+    events = []
+    for block in body.strip().split('\n\n'):
+        event, data = 'message', None
+        for line in block.splitlines():
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                data = json.loads(line[len('data: '):])
+        events.append((event, data))
+    return events
+
+
+def check(name, body, saved, breaker):
+    events = parse_events(body)
+    kinds = [event for event, _ in events]
+    tokens = [data['token'] for event, data in events if event == 'message']
+    failures = []
+    if tokens != TOKENS:
+        failures.append(f'expected tokens {TOKENS}, got {tokens}')
+    if kinds[-1:] != ['error']:
+        failures.append(f'expected the stream to end with an error event, got {kinds}')
+    if 'done' in kinds:
+        failures.append('sent a done event for a truncated answer')
+    if saved:
+        failures.append(f'saved {len(saved)} partial answer(s)')
+    breaker_stats = breaker.stats()
+    if breaker_stats['calls_in_window'] != 1 or breaker_stats['failure_rate'] != 1.0:
+        failures.append(f'expected one failure in the circuit breaker, got {breaker_stats}')
+    print(f"{name:<6} {'ok' if not failures else 'FAIL'}  events={kinds}")
+    for failure in failures:
+        print(f'       {failure}')
+    return not failures
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_PATH'] = os.path.join(tmp, 'stream_errors.db')
+    os.environ.setdefault('OPENAI_API_KEY', 'fake')
+    os.environ['CHAT_WARM_UP'] = 'false'
+
+    from starlette.testclient import TestClient
+
+    import asgi
+    import chat_service
+
+    from circuit_breaker import CircuitBreaker
+
+    saved = []
+    chat_service.save_chat_message = lambda *args: saved.append(args)
+    asgi.chatbot.providers = BrokenStreamPool()
+    payload = {'message': 'How do I switch careers?', 'session_id': 'stream-check', 'no_cache': True}
+
+    ok = True
+    asgi.chatbot.breaker = CircuitBreaker('llm')
+    response = asgi.flask_app.test_client().post('/api/chat/stream', json=payload)
+    ok &= check('flask', response.get_data(as_text=True), saved, asgi.chatbot.breaker)
+
+    saved.clear()
+    asgi.chatbot.breaker = CircuitBreaker('llm')
+    with TestClient(asgi.app) as client:
+        response = client.post('/api/chat/stream', json=payload)
+        ok &= check('asgi', response.text, saved, asgi.chatbot.breaker)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Fake OpenAI-compatible LLM server
+Answers /v1/chat/completions (plain and streaming) with canned career advice after
+a configurable delay and token rate, so load tests run offline and reproducibly.
+
+Usage: python benchmarks/fake_llm.py [--port 8089] [--latency-ms 300] [--tokens-per-s 50] [--tokens 120]
+Then start the app with OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ADVICE = (
+    "Based on your strengths, consider roles where you can apply them every day. "
+    "Start by listing the skills you enjoy using most, then look for positions that "
+    "reward them. Build a small portfolio, reach out to people already doing the work "
+    "and ask what they wish they had known earlier. Set one concrete goal for this month "
+    "and review your progress each week. "
+)
+WORDS = ADVICE.split()
+
+
+class FakeLLMConfig:
+    """Latency model shared by all requests"""
+
+    def __init__(self, latency_ms=300, jitter_ms=50, tokens_per_s=50, tokens=120, error_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_s = tokens_per_s
+        self.tokens = tokens
+        self.error_rate = error_rate
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                return self._send_json(404, {'error': {'message': 'Not found'}})
+
+            time.sleep(max(0.0, config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000)
+            if random.random() < config.error_rate:
+                return self._send_json(503, {'error': {'message': 'Simulated overload', 'type': 'server_error'}})
+
+            model = body.get('model', 'fake-model')
+            tokens = [WORDS[i % len(WORDS)] + ' ' for i in range(config.tokens)]
+            prompt_tokens = sum(len(str(m.get('content', '')).split()) for m in body.get('messages', []))
+            if body.get('stream'):
+                include_usage = (body.get('stream_options') or {}).get('include_usage', False)
+                self._stream(model, tokens, prompt_tokens, include_usage)
+            else:
+                time.sleep(len(tokens) / config.tokens_per_s if config.tokens_per_s else 0)
+                self._send_json(200, {
+                    'id': f'chatcmpl-{uuid.uuid4().hex}',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': ''.join(tokens).strip()},
+                        'finish_reason': 'stop'
+                    }],
+                    'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': len(tokens),
+                              'total_tokens': prompt_tokens + len(tokens)}
+                })
+
+        def _stream(self, model, tokens, prompt_tokens, include_usage=False):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+
+            def chunk(delta, finish_reason=None):
+                return {
+                    'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                    'model': model, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+                }
+
+            self._write_event(chunk({'role': 'assistant', 'content': ''}))
+            interval = 1 / config.tokens_per_s if config.tokens_per_s else 0
+            for token in tokens:
+                time.sleep(interval)
+                self._write_event(chunk({'content': token}))
+            self._write_event(chunk({}, 'stop'))
+            if include_usage:
+                self._write_event(dict(chunk({}), choices=[], usage={
+                    'prompt_tokens': prompt_tokens, 'completion_tokens': len(tokens),
+                    'total_tokens': prompt_tokens + len(tokens)
+                }))
+            self._write_chunk(b'data: [DONE]\n\n')
+            self._write_chunk(b'')
+
+        def _write_event(self, payload):
+            self._write_chunk(f'data: {json.dumps(payload)}\n\n'.encode('utf-8'))
+
+        def _write_chunk(self, data):
+            self.wfile.write(f'{len(data):X}\r\n'.encode('ascii') + data + b'\r\n')
+            self.wfile.flush()
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections is expected under load
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_server(config, host='127.0.0.1', port=0):
+    """Serve in a daemon thread and return the server; port 0 picks a free port"""
+    server = FakeLLMServer((host, port), make_handler(config))
+    threading.Thread(target=server.serve_forever, name='fake-llm', daemon=True).start()
+    return server
+
+
+def add_arguments(parser, prefix=''):
+    """Add the latency model options to an argparse parser"""
+    parser.add_argument(f'--{prefix}latency-ms', type=float, default=300, help='Delay before the first token')
+    parser.add_argument(f'--{prefix}jitter-ms', type=float, default=50)
+    parser.add_argument(f'--{prefix}tokens-per-s', type=float, default=50)
+    parser.add_argument(f'--{prefix}tokens', type=int, default=120, help='Tokens per response')
+    parser.add_argument(f'--{prefix}error-rate', type=float, default=0.0, help='Fraction of calls answered with 503')
+
+
+def config_from_args(args, prefix=''):
+    prefix = prefix.replace('-', '_')
+    return FakeLLMConfig(*(getattr(args, prefix + name) for name in
+                           ('latency_ms', 'jitter_ms', 'tokens_per_s', 'tokens', 'error_rate')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake OpenAI-compatible LLM server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeLLMServer((args.host, args.port), make_handler(config_from_args(args)))
+    print(f"Fake LLM listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,440 @@
+"""
+End-to-end load benchmark
+Starts the fake LLM and the app (gunicorn, gunicorn with the async chat routes, or
+the Flask dev server), drives every route with concurrent virtual users for a fixed
+duration and reports per-route p50/p95/p99 latency and throughput. Results are
+written as JSON so runs of different versions can be compared.
+
+Usage: python benchmarks/load_test.py [--users 20] [--duration 30] [--server gunicorn|asgi|flask]
+                                      [--routes chat,chat_stream] [--output load_results.json]
+       python benchmarks/load_test.py --url http://127.0.0.1:5000   (existing server; its LLM is used as is)
+"""
+
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+
+import fake_llm
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PERSONALITY_TYPES = ('Analyst', 'Leader', 'Collaborator')
+QUESTION_IDS = range(1, 9)
+
+
+class Client:
+    """Keep-alive HTTP client with a cookie jar, one per virtual user"""
+
+    def __init__(self, base_url, timeout=60):
+        parsed = urllib.parse.urlparse(base_url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.timeout = timeout
+        self.cookies = {}
+        self.conn = None
+
+    def request(self, method, path, body=None, content_type='application/json', stream=False):
+        """Send a request; returns (status, body bytes, seconds until the first body byte)"""
+        if body is not None and content_type == 'application/json':
+            body = json.dumps(body).encode('utf-8')
+        headers = {'Cookie': '; '.join(f'{k}={v}' for k, v in self.cookies.items())}
+        if os.getenv('DIAGNOSTICS_TOKEN'):
+            # Lets the diagnostic routes through when the app under test requires the token
+            headers['Authorization'] = f"Bearer {os.environ['DIAGNOSTICS_TOKEN']}"
+        if body is not None:
+            headers['Content-Type'] = content_type
+        for attempt in (1, 2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                start = time.perf_counter()
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                first = response.read(1) if stream else b''
+                first_byte = time.perf_counter() - start
+                data = first + response.read()
+                break
+            except (http.client.HTTPException, ConnectionError, socket.timeout):
+                # Server closed an idle keep-alive connection; retry once on a fresh one
+                self.conn.close()
+                self.conn = None
+                if attempt == 2:
+                    raise
+        for header, value in response.getheaders():
+            if header.lower() == 'set-cookie':
+                name, _, rest = value.partition('=')
+                self.cookies[name.strip()] = rest.split(';', 1)[0]
+        if response.getheader('Connection', '').lower() == 'close':
+            self.conn.close()
+            self.conn = None
+        return response.status, data, first_byte
+
+
+def random_answers():
+    return [{'question_id': q, 'option_index': random.randrange(3)} for q in QUESTION_IDS]
+
+
+def resume_docx():
+    """A small .docx resume for upload requests"""
+    from docx import Document
+    document = Document()
+    for line in ('Jane Doe', 'Data Analyst', 'Summary', 'Analyst who turns data into decisions.',
+                 'Skills', 'Python, SQL, statistics', 'Experience', 'Analyst, Example Corp (2020-2024)'):
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def multipart(field, filename, content):
+    boundary = f'----loadtest{random.getrandbits(64):x}'
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n').encode('utf-8') + content + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+class VirtualUser:
+    """One logged-in user issuing a weighted random mix of requests"""
+
+    def __init__(self, index, base_url, record, resume):
+        self.index = index
+        self.client = Client(base_url)
+        self.record = record
+        self.resume = resume
+        self.email = f'load{index}-{random.getrandbits(32):x}@example.com'
+        self.password = 'load-test-password'
+        self.session_id = f'load-session-{index}'
+        self.turn = 0
+
+    def call(self, name, method, path, body=None, expect=(200,), **kwargs):
+        try:
+            status, data, first_byte = self.client.request(method, path, body, **kwargs)
+            ok = status in expect
+        except Exception:
+            status, data, first_byte, ok = 0, b'', 0.0, False
+        self.record(name, first_byte if kwargs.get('stream') else None, ok)
+        return status, data
+
+    # Operations, keyed by name in OPERATIONS below
+
+    def register(self):
+        self.call('POST /api/register', 'POST', '/api/register', {
+            'email': self.email, 'password': self.password, 'first_name': 'Load', 'last_name': str(self.index)
+        }, expect=(201,))
+
+    def index_page(self):
+        self.call('GET /', 'GET', '/')
+
+    def questions(self):
+        self.call('GET /api/questions', 'GET', '/api/questions')
+
+    def personality_types(self):
+        self.call('GET /api/personality-types', 'GET', '/api/personality-types')
+
+    def personality_type(self):
+        self.call('GET /api/personality-types/<name>', 'GET', f'/api/personality-types/{random.choice(PERSONALITY_TYPES)}')
+
+    def submit_assessment(self):
+        self.call('POST /api/submit-assessment', 'POST', '/api/submit-assessment',
+                  {'session_id': self.session_id, 'answers': random_answers()})
+
+    def batch_score(self):
+        self.call('POST /api/assessments/batch-score', 'POST', '/api/assessments/batch-score',
+                  {'assessments': [{'answers': random_answers()} for _ in range(20)]})
+
+    def chat(self):
+        self.turn += 1
+        self.call('POST /api/chat', 'POST', '/api/chat', {
+            'session_id': self.session_id, 'personality_type': random.choice(PERSONALITY_TYPES),
+            'message': f'What should I focus on next? (user {self.index}, turn {self.turn})'
+        })
+
+    def chat_stream(self):
+        self.turn += 1
+        self.call('POST /api/chat/stream', 'POST', '/api/chat/stream', {
+            'session_id': self.session_id, 'personality_type': random.choice(PERSONALITY_TYPES),
+            'message': f'Which skills should I build? (user {self.index}, turn {self.turn})'
+        }, stream=True)
+
+    def upload_resume(self):
+        body, content_type = multipart('file', 'resume.docx', self.resume)
+        status, data = self.call('POST /api/upload-resume', 'POST', '/api/upload-resume', body,
+                                 expect=(202,), content_type=content_type)
+        if status == 202:
+            job_id = json.loads(data)['job_id']
+            self.call('GET /api/resume-jobs/<id>', 'GET', f'/api/resume-jobs/{job_id}')
+
+    def profile(self):
+        self.call('GET /api/user/profile', 'GET', '/api/user/profile')
+
+    def update_profile(self):
+        self.call('PUT /api/user/profile', 'PUT', '/api/user/profile',
+                  {'preferences': {'theme': random.choice(('light', 'dark'))}})
+
+    def assessment_history(self):
+        self.call('GET /api/user/assessment-history', 'GET', '/api/user/assessment-history?limit=20')
+
+    def resumes(self):
+        self.call('GET /api/user/resumes', 'GET', '/api/user/resumes?limit=20')
+
+    def chat_history(self):
+        self.call('GET /api/user/chat-history', 'GET', '/api/user/chat-history?limit=20')
+
+    def user_status(self):
+        self.call('GET /api/user/status', 'GET', '/api/user/status')
+
+    def relogin(self):
+        self.call('POST /api/logout', 'POST', '/api/logout')
+        self.call('POST /api/login', 'POST', '/api/login', {'email': self.email, 'password': self.password})
+
+    def cache_stats(self):
+        self.call('GET /api/cache-stats', 'GET', '/api/cache-stats')
+
+
+# Operation name -> (method, relative weight)
+OPERATIONS = {
+    'index': (VirtualUser.index_page, 2),
+    'questions': (VirtualUser.questions, 10),
+    'personality_types': (VirtualUser.personality_types, 3),
+    'personality_type': (VirtualUser.personality_type, 3),
+    'submit_assessment': (VirtualUser.submit_assessment, 8),
+    'batch_score': (VirtualUser.batch_score, 1),
+    'chat': (VirtualUser.chat, 6),
+    'chat_stream': (VirtualUser.chat_stream, 6),
+    'upload_resume': (VirtualUser.upload_resume, 1),
+    'profile': (VirtualUser.profile, 8),
+    'update_profile': (VirtualUser.update_profile, 2),
+    'assessment_history': (VirtualUser.assessment_history, 4),
+    'resumes': (VirtualUser.resumes, 2),
+    'chat_history': (VirtualUser.chat_history, 4),
+    'user_status': (VirtualUser.user_status, 6),
+    'relogin': (VirtualUser.relogin, 1),
+    'cache_stats': (VirtualUser.cache_stats, 1)
+}
+
+
+class Recorder:
+    """Collects (latency, ok) samples per route once the warm-up period is over"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.first_byte = {}
+        self.measuring = False
+        self.local = threading.local()
+
+    def start_timer(self):
+        self.local.start = time.perf_counter()
+
+    def __call__(self, name, first_byte, ok):
+        latency = time.perf_counter() - self.local.start
+        self.local.start = time.perf_counter()
+        if not self.measuring:
+            return
+        with self.lock:
+            self.samples.setdefault(name, []).append((latency, ok))
+            if first_byte is not None:
+                self.first_byte.setdefault(name, []).append(first_byte)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, timeout=60):
+    client = Client(url, timeout=2)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if client.request('GET', '/api/questions')[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'App did not come up at {url}')
+
+
+def start_app(args, llm_url, workdir):
+    """Launch the app in a subprocess against a fresh database"""
+    port = free_port()
+    env = dict(os.environ,
+               PORT=str(port),
+               DATABASE_PATH=os.path.join(workdir, 'load.db'),
+               UPLOAD_FOLDER=os.path.join(workdir, 'uploads'),
+               OPENAI_API_KEY='fake-key',
+               OPENAI_BASE_URL=llm_url,
+               WEB_CONCURRENCY=str(args.workers),
+               GUNICORN_THREADS=str(args.threads),
+               # Virtual users chat far faster than the per-user allowance
+               CHAT_RATE_LIMIT_ENABLED='false',
+               PYTHONUNBUFFERED='1')
+    if args.server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    elif args.server == 'asgi':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                   '-k', 'uvicorn_worker.UvicornWorker', 'asgi:app']
+    else:
+        command = [sys.executable, '-c',
+                   f'from app import create_app; create_app().run(host="127.0.0.1", port={port}, threaded=True)']
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return process, f'http://127.0.0.1:{port}'
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args, base_url):
+    names = args.routes.split(',') if args.routes else list(OPERATIONS)
+    unknown = [name for name in names if name not in OPERATIONS]
+    if unknown:
+        raise SystemExit(f"Unknown routes: {', '.join(unknown)} (choose from {', '.join(OPERATIONS)})")
+    operations = [OPERATIONS[name][0] for name in names]
+    weights = [OPERATIONS[name][1] for name in names]
+
+    recorder = Recorder()
+    resume = resume_docx()
+    stop = threading.Event()
+
+    def user_loop(index):
+        user = VirtualUser(index, base_url, recorder, resume)
+        recorder.start_timer()
+        user.register()
+        while not stop.is_set():
+            operation = random.choices(operations, weights)[0]
+            recorder.start_timer()
+            operation(user)
+
+    threads = [threading.Thread(target=user_loop, args=(i,), daemon=True) for i in range(args.users)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+    recorder.measuring = True
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    recorder.measuring = False
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=60)
+
+    routes = {}
+    all_latencies, all_errors = [], 0
+    for name, samples in sorted(recorder.samples.items()):
+        latencies = [latency for latency, _ in samples]
+        errors = sum(1 for _, ok in samples if not ok)
+        routes[name] = summarize(latencies, errors, elapsed)
+        if name in recorder.first_byte:
+            first_byte = sorted(recorder.first_byte[name])
+            routes[name]['first_byte_p50_ms'] = round(percentile(first_byte, 50) * 1000, 2)
+            routes[name]['first_byte_p95_ms'] = round(percentile(first_byte, 95) * 1000, 2)
+        all_latencies += latencies
+        all_errors += errors
+
+    try:
+        status, data, _ = Client(base_url).request('GET', '/api/cache-stats')
+        server_stats = json.loads(data) if status == 200 else None
+    except (OSError, ValueError):
+        server_stats = None
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'duration_s': round(elapsed, 2),
+        'total': summarize(all_latencies, all_errors, elapsed),
+        'routes': routes,
+        'server_stats': server_stats
+    }
+
+
+def print_report(results):
+    print(f"{'route':<38} {'reqs':>6} {'err':>4} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, stats in list(results['routes'].items()) + [('TOTAL', results['total'])]:
+        print(f"{name:<38} {stats['requests']:>6} {stats['errors']:>4} {stats['throughput_rps']:>8.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end load benchmark')
+    parser.add_argument('--url', help='Benchmark an already running server instead of starting one')
+    parser.add_argument('--server', choices=('gunicorn', 'asgi', 'flask'), default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='Unmeasured seconds before measuring')
+    parser.add_argument('--routes', help=f"Comma-separated subset of: {', '.join(OPERATIONS)}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='load_results.json')
+    fake_llm.add_arguments(parser, prefix='llm-')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    if args.url:
+        results = run(args, args.url)
+    else:
+        llm = fake_llm.start_server(fake_llm.config_from_args(args, prefix='llm-'))
+        llm_url = f'http://127.0.0.1:{llm.server_address[1]}/v1'
+        with tempfile.TemporaryDirectory() as workdir:
+            process, base_url = start_app(args, llm_url, workdir)
+            try:
+                try:
+                    wait_for(base_url)
+                except RuntimeError:
+                    with open(os.path.join(workdir, 'server.log')) as log:
+                        print(log.read()[-4000:], file=sys.stderr)
+                    raise
+                results = run(args, base_url)
+            finally:
+                process.terminate()
+                process.wait(timeout=60)
+        llm.shutdown()
+
+    print_report(results)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
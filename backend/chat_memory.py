@@ -0,0 +1,98 @@
+"""
+Conversation memory for the career chatbot
+Each chat session keeps its last few turns verbatim plus a rolling summary of
+everything older, so prompt size stays flat however long the conversation runs.
+"""
+
+import os
+
+from db import connection
+
+MEMORY_TURNS = int(os.getenv('CHAT_MEMORY_TURNS', 6))
+TURN_MAX_CHARS = int(os.getenv('CHAT_MEMORY_TURN_MAX_CHARS', 1000))
+SUMMARY_MAX_CHARS = int(os.getenv('CHAT_SUMMARY_MAX_CHARS', 1500))
+SUMMARY_ENTRY_CHARS = 200
+
+
+class ChatMemory:
+    """Recent turns (oldest first) and the rolling summary of earlier ones"""
+
+    __slots__ = ('session_id', 'user_id', 'turns', 'summary')
+
+    def __init__(self, session_id=None, user_id=None, turns=None, summary=''):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.turns = turns or []
+        self.summary = summary
+
+    @property
+    def enabled(self):
+        return self.session_id is not None
+
+    def history(self):
+        """Recent turns as (user message, assistant response) pairs"""
+        return [(message, response) for _, message, response in self.turns]
+
+    def next_summary(self):
+        """
+        Summary to store once a new turn is added
+
+        Returns None while the window still has room; otherwise folds the turn
+        that is about to leave the window into the summary.
+        """
+        if len(self.turns) < MEMORY_TURNS:
+            return None
+        _, message, response = self.turns[0]
+        return fold_turn(self.summary, message, response)
+
+
+def load_memory(session_id, user_id):
+    """Load a session's recent turns and summary with a single indexed query"""
+    # The shared 'guest' session id would mix unrelated conversations
+    if not session_id or session_id == 'guest' or MEMORY_TURNS <= 0:
+        return ChatMemory()
+
+    with connection() as conn:
+        rows = conn.execute('''
+            SELECT c.id, c.message, c.response, s.summary
+            FROM chat_sessions c
+            LEFT JOIN chat_summaries s ON s.session_id = c.session_id AND s.user_id IS c.user_id
+            WHERE c.session_id = ? AND c.user_id IS ?
+            ORDER BY c.id DESC
+            LIMIT ?
+        ''', (session_id, user_id, MEMORY_TURNS)).fetchall()
+
+    turns = [
+        (row['id'], row['message'][:TURN_MAX_CHARS], row['response'][:TURN_MAX_CHARS])
+        for row in reversed(rows)
+    ]
+    summary = rows[0]['summary'] if rows and rows[0]['summary'] else ''
+    return ChatMemory(session_id, user_id, turns, summary)
+
+
+def fold_turn(summary, message, response):
+    """Append a condensed turn to the summary, dropping the oldest entries past the cap"""
+    answer = response.split('\n', 1)[0]
+    entry = f"- Asked: {_clip(message)} Advised: {_clip(answer)}"
+    entries = (summary.split('\n') if summary else []) + [entry]
+    while len(entries) > 1 and sum(len(e) + 1 for e in entries) > SUMMARY_MAX_CHARS:
+        entries.pop(0)
+    return '\n'.join(entries)
+
+
+def save_summary(conn, memory, summary):
+    """Store a session's updated summary inside the caller's transaction"""
+    # Replace rather than upsert: guests have a NULL user_id, which never conflicts in the key
+    conn.execute(
+        'DELETE FROM chat_summaries WHERE session_id = ? AND user_id IS ?',
+        (memory.session_id, memory.user_id)
+    )
+    conn.execute('''
+        INSERT INTO chat_summaries (session_id, user_id, summary, through_id)
+        VALUES (?, ?, ?, ?)
+    ''', (memory.session_id, memory.user_id, summary, memory.turns[0][0]))
+
+
+def _clip(text):
+    text = ' '.join(text.split())
+    return text if len(text) <= SUMMARY_ENTRY_CHARS else text[:SUMMARY_ENTRY_CHARS].rsplit(' ', 1)[0] + '...'
@@ -0,0 +1,76 @@
+"""
+Chat request helpers
+Shared by the Flask chat routes (app.py) and the async ones (asgi.py): resolving
+the resume context, saving an exchange, and formatting rate-limit responses and
+Server-Sent Events. Responses are returned as plain values so each framework
+builds its own.
+"""
+
+import json
+import math
+
+import chat_memory
+from models import get_current_resume, set_resume_digest, store_resume_blob
+from resume_digest import build_digest, cached_digest
+from write_behind import writer
+
+
+def resolve_resume_data(user_id, resume_data):
+    """
+    Resume context for the chat prompt, as a token-budgeted digest
+
+    Falls back to the authenticated user's current resume when none was sent,
+    using its stored digest (generated once, backfilled here for older rows).
+    """
+    if resume_data:
+        # Clients resend the same text with every message
+        return cached_digest(resume_data)
+    if user_id:
+        current_resume = get_current_resume(user_id)
+        if current_resume and current_resume.get('resume_text'):
+            if current_resume.get('resume_digest') is None:
+                current_resume['resume_digest'] = build_digest(current_resume['resume_text'])
+                set_resume_digest(current_resume['id'], current_resume['resume_digest'])
+            return current_resume['resume_digest']
+    return resume_data
+
+
+def save_chat_message(session_id, user_id, message, response, personality_type, resume_data, memory=None):
+    """
+    Store one chat exchange in chat_sessions, referencing the resume by content hash
+
+    When the exchange pushes the oldest remembered turn out of the memory window,
+    that turn is folded into the session's rolling summary in the same transaction.
+    With write-behind enabled the write is queued rather than committed here.
+    """
+    summary = memory.next_summary() if memory and memory.enabled else None
+
+    def write(conn):
+        resume_hash = store_resume_blob(conn, resume_data)
+        conn.execute('''
+            INSERT INTO chat_sessions (session_id, user_id, message, response, personality_type, resume_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (session_id, user_id, message, response, personality_type, resume_hash))
+        if summary is not None:
+            chat_memory.save_summary(conn, memory, summary)
+
+    writer.submit(write)
+
+
+def rate_limited_response(error):
+    """
+    429 telling the client when its next chat request will be accepted
+
+    Returns:
+        tuple: (JSON payload, status code, headers), as Flask returns them from a
+            view and Starlette's JSONResponse takes them
+    """
+    retry_after = math.ceil(error.retry_after)
+    return ({'success': False, 'error': str(error), 'retry_after': retry_after},
+            429, {'Retry-After': str(retry_after)})
+
+
+def sse_event(payload, event=None):
+    """Format a JSON payload as a Server-Sent Events message"""
+    message = f'event: {event}\n' if event else ''
+    return f'{message}data: {json.dumps(payload)}\n\n'
@@ -3,32 +3,41 @@ Career Chatbot using OpenAI API and LangChain
 Provides personalized career advice based on assessment results and resume data
 """
 
+import asyncio
+import hashlib
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from cache import TTLCache
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from llm_providers import ProviderPool
+from metrics import chat_fallbacks_total
+from scheduler import ChatScheduler, Overloaded
+from singleflight import AsyncSingleFlight, SingleFlight
 
 # Load environment variables
 load_dotenv()
 
-class CareerChatbot:
-    def __init__(self):
-        # Initialize LangChain components (only if API key is available)
-        api_key = os.getenv('OPENAI_API_KEY')
-        if api_key:
-            self.llm = ChatOpenAI(
-                model="gpt-4o-mini",  # Modern chat model
-                temperature=0.5,
-                max_tokens=500,
-                openai_api_key=api_key
-            )
-        else:
-            self.llm = None
-        
-        # Create prompt template for career advice
-        self.career_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a professional career counselor with expertise in career development and personality assessment.
+MODEL_NAME = "gpt-4o-mini"  # Modern chat model
+TEMPERATURE = 0.5
+
+# OpenAI-compatible endpoint; point it at benchmarks/fake_llm.py for offline load tests.
+# Several backends with hedging and failover are configured with LLM_PROVIDERS (see llm_providers.py)
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None
+
+# Response cache settings
+CACHE_ENABLED = os.getenv('CHAT_CACHE_ENABLED', 'true').lower() != 'false'
+CACHE_SIZE = int(os.getenv('CHAT_CACHE_SIZE', 512))
+CACHE_TTL = int(os.getenv('CHAT_CACHE_TTL', 3600))
+
+# Longest a request waits on an identical in-flight LLM call before giving up
+COALESCE_TIMEOUT = float(os.getenv('CHAT_COALESCE_TIMEOUT', 30))
+
+# Load LangChain in a background thread once the server is up (see start_warm_up)
+WARM_UP_ENABLED = os.getenv('CHAT_WARM_UP', 'true').lower() != 'false'
+
+SYSTEM_PROMPT = """You are a professional career counselor with expertise in career development and personality assessment.
             
             Based on the user's personality type and background, provide personalized career advice that is:
             1. Specific and actionable
@@ -36,19 +45,101 @@ class CareerChatbot:
             3. Realistic and practical
             4. Encouraging and supportive
             
-            Keep your response concise (2-3 paragraphs) and focus on the most relevant advice for their situation."""),
-            ("human", """User's Career Personality Type: {personality_type}
+            Keep your response concise (2-3 paragraphs) and focus on the most relevant advice for their situation."""
+
+HUMAN_PROMPT = """User's Career Personality Type: {personality_type}
             Resume/Background Information: {resume_data}
-            User's Question: {user_message}""")
-        ])
+            User's Question: {user_message}"""
+
+class CareerChatbot:
+    def __init__(self):
+        self.model_name = MODEL_NAME
+        self.temperature = TEMPERATURE
+        
+        # LangChain and the OpenAI clients are imported and built on first use,
+        # so routes that never chat don't pay for them at startup
+        self.providers = ProviderPool.from_env(
+            self.model_name, self.temperature, api_key=os.getenv('OPENAI_API_KEY'), base_url=OPENAI_BASE_URL
+        )
+        self._career_prompt = None
+        self._init_lock = threading.Lock()
+        self._warm_up_thread = None
+        
+        # Cache of generated answers for repeated questions
+        self.cache_enabled = CACHE_ENABLED
+        self.response_cache = TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+        
+        # Identical concurrent prompts share one LLM call
+        self.in_flight = SingleFlight()
+        self.async_in_flight = AsyncSingleFlight()
+        
+        # Skips the LLM and answers with the default response while it is failing or slow
+        self.breaker = CircuitBreaker('llm')
+        
+        # Caps concurrent LLM calls and queues the rest fairly across users
+        self.scheduler = ChatScheduler()
+        # Hedged calls take a slot too, so they can't push past the cap
+        self.providers.admission = self.scheduler
+        
+    @property
+    def career_prompt(self):
+        """Prompt template for career advice, built on first use"""
+        if self._career_prompt is None:
+            with self._init_lock:
+                if self._career_prompt is None:
+                    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+                    
+                    self._career_prompt = ChatPromptTemplate.from_messages([
+                        ("system", SYSTEM_PROMPT),
+                        # Multi-turn memory: rolling summary of older turns, then the most recent turns
+                        MessagesPlaceholder("conversation_summary", optional=True),
+                        MessagesPlaceholder("history", optional=True),
+                        ("human", HUMAN_PROMPT)
+                    ])
+        return self._career_prompt
+    
+    def start_warm_up(self):
+        """Build the prompt and LLM clients in a daemon thread so the first chat request doesn't wait on imports"""
+        if not WARM_UP_ENABLED or not self.providers.available:
+            return None
+        with self._init_lock:
+            # Both the gunicorn hook and the ASGI lifespan may ask; warm up once
+            if self._warm_up_thread is None:
+                self._warm_up_thread = threading.Thread(target=self._warm_up, name='chatbot-warm-up', daemon=True)
+                self._warm_up_thread.start()
+        return self._warm_up_thread
+    
+    def _warm_up(self):
+        try:
+            self.career_prompt
+            self.providers.warm_up()
+        except Exception as e:
+            print(f"Chatbot warm-up failed: {e}")
+    
+    def check_rate(self, client, message, personality_type="", resume_data="", use_cache=True,
+                   history=None, summary="", stream=False):
+        """
+        Spend one of the client's chat tokens if this chat will call the LLM
         
-        # Create LLM chain (only if LLM is available)
-        if self.llm:
-            self.career_chain = self.career_prompt | self.llm | StrOutputParser()
-        else:
-            self.career_chain = None
+        Answers from the response cache and (for non-streamed chats) answers
+        shared with an identical call already in flight cost nothing, so many
+        users asking the same question don't use up each other's allowance.
+        Takes the same arguments as get_career_advice.
+        
+        Raises:
+            scheduler.RateLimited: If the client's bucket is empty
+        """
+        if not self.providers.available:
+            return
+        prompt_key = self._prompt_key(message, personality_type, resume_data, history, summary)
+        if use_cache and self.cache_enabled and prompt_key in self.response_cache:
+            return
+        if not stream and (self.in_flight.in_flight(prompt_key) or self.async_in_flight.in_flight(prompt_key)):
+            return
+        self.scheduler.check_rate(client)
     
-    def get_career_advice(self, message, personality_type="", resume_data=""):
+    def get_career_advice(self, message, personality_type="", resume_data="", use_cache=True,
+                          history=None, summary="", client=None):
         """
         Get career advice based on user message, personality type, and resume data
         
@@ -56,27 +147,311 @@ class CareerChatbot:
             message (str): User's question or message
             personality_type (str): User's assessed personality type
             resume_data (str): Resume or background information
+            use_cache (bool): Set to False to bypass the response cache
+            history (list): Recent (user message, response) pairs, oldest first
+            summary (str): Rolling summary of turns older than history
+            client (scheduler.Client): Who the LLM call is queued as when all slots are busy
             
         Returns:
             str: AI-generated career advice
         """
         try:
             # If no OpenAI API key is set or LLM is not available, return a default response
-            if not self.career_chain:
-                return self._get_default_response(message, personality_type)
+            if not self.providers.available:
+                return self._fallback(message, personality_type, 'no_llm')
             
-            # Generate response using LangChain
-            response = self.career_chain.invoke({
-                "personality_type": personality_type or "General",
-                "resume_data": resume_data or "No resume information provided",
-                "user_message": message
-            })
+            prompt_key = self._prompt_key(message, personality_type, resume_data, history, summary)
+            use_cache = use_cache and self.cache_enabled
+            if use_cache:
+                cached = self.response_cache.get(prompt_key)
+                if cached is not None:
+                    return cached
             
-            return response.strip()
+            # Generate response through the provider pool (deadline, hedging, failover),
+            # sharing the call with any identical request already waiting on the LLM
+            messages = self._format_messages(message, personality_type, resume_data, history, summary)
+            response = self.in_flight.do(
+                prompt_key,
+                lambda: self._invoke_llm(messages, client),
+                timeout=COALESCE_TIMEOUT
+            )
             
+            if use_cache:
+                self.response_cache.set(prompt_key, response)
+            return response
+            
+        except CircuitOpenError:
+            return self._fallback(message, personality_type, 'circuit_open')
+        except Overloaded:
+            return self._fallback(message, personality_type, 'overloaded')
         except Exception as e:
             print(f"Error generating AI response: {e}")
-            return self._get_default_response(message, personality_type)
+            return self._fallback(message, personality_type, 'error')
+    
+    def stream_career_advice(self, message, personality_type="", resume_data="", use_cache=True,
+                             history=None, summary="", client=None):
+        """
+        Stream career advice as it is generated
+        
+        Args:
+            message (str): User's question or message
+            personality_type (str): User's assessed personality type
+            resume_data (str): Resume or background information
+            use_cache (bool): Set to False to bypass the response cache
+            history (list): Recent (user message, response) pairs, oldest first
+            summary (str): Rolling summary of turns older than history
+            client (scheduler.Client): Who the LLM call is queued as when all slots are busy
+            
+        Yields:
+            str: Successive chunks of the AI-generated career advice
+        """
+        # Without an LLM the whole fallback response is sent as a single chunk
+        if not self.providers.available:
+            yield self._fallback(message, personality_type, 'no_llm')
+            return
+        
+        cache_key = None
+        if use_cache and self.cache_enabled:
+            cache_key = self._prompt_key(message, personality_type, resume_data, history, summary)
+        if cache_key:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        try:
+            with self.scheduler.slot(client):
+                yield from self._stream_llm(message, personality_type, resume_data, history, summary, cache_key)
+        except Overloaded:
+            yield self._fallback(message, personality_type, 'overloaded')
+    
+    def _stream_llm(self, message, personality_type, resume_data, history, summary, cache_key):
+        """Stream from the provider pool through the circuit breaker, caching the full answer"""
+        if not self.breaker.allow():
+            yield self._fallback(message, personality_type, 'circuit_open')
+            return
+        
+        chunks = []
+        first_token_seconds = None
+        recorded = False
+        started = time.monotonic()
+        try:
+            for chunk in self.providers.stream(
+                self._format_messages(message, personality_type, resume_data, history, summary)
+            ):
+                if chunk:
+                    if first_token_seconds is None:
+                        first_token_seconds = time.monotonic() - started
+                    chunks.append(chunk)
+                    yield chunk
+            # Judged once the stream has finished, by time to first token
+            self.breaker.record_success(first_token_seconds if first_token_seconds is not None
+                                        else time.monotonic() - started)
+            recorded = True
+            if cache_key:
+                self.response_cache.set(cache_key, ''.join(chunks).strip())
+        except Exception as e:
+            print(f"Error streaming AI response: {e}")
+            # A stream that breaks off part way counts as a failure too
+            if not recorded:
+                self.breaker.record_failure()
+                recorded = True
+            # Fall back if nothing reached the client yet; otherwise the answer is cut
+            # short, so let the route report the error rather than save a partial reply
+            if chunks:
+                raise
+            yield self._fallback(message, personality_type, 'error')
+        finally:
+            # The client went away mid-stream: no verdict on the LLM
+            if not recorded:
+                self.breaker.release()
+    
+    async def aget_career_advice(self, message, personality_type="", resume_data="", use_cache=True,
+                                 history=None, summary="", client=None):
+        """
+        Async get_career_advice for the ASGI chat routes; shares the cache, circuit breaker and scheduler
+        
+        Args:
+            message (str): User's question or message
+            personality_type (str): User's assessed personality type
+            resume_data (str): Resume or background information
+            use_cache (bool): Set to False to bypass the response cache
+            history (list): Recent (user message, response) pairs, oldest first
+            summary (str): Rolling summary of turns older than history
+            client (scheduler.Client): Who the LLM call is queued as when all slots are busy
+            
+        Returns:
+            str: AI-generated career advice
+        """
+        try:
+            if not self.providers.available:
+                return self._fallback(message, personality_type, 'no_llm')
+            
+            prompt_key = self._prompt_key(message, personality_type, resume_data, history, summary)
+            use_cache = use_cache and self.cache_enabled
+            if use_cache:
+                cached = self.response_cache.get(prompt_key)
+                if cached is not None:
+                    return cached
+            
+            messages = self._format_messages(message, personality_type, resume_data, history, summary)
+            response = await self.async_in_flight.do(
+                prompt_key,
+                lambda: self._ainvoke_llm(messages, client),
+                timeout=COALESCE_TIMEOUT
+            )
+            
+            if use_cache:
+                self.response_cache.set(prompt_key, response)
+            return response
+            
+        except CircuitOpenError:
+            return self._fallback(message, personality_type, 'circuit_open')
+        except Overloaded:
+            return self._fallback(message, personality_type, 'overloaded')
+        except Exception as e:
+            print(f"Error generating AI response: {e}")
+            return self._fallback(message, personality_type, 'error')
+    
+    async def astream_career_advice(self, message, personality_type="", resume_data="", use_cache=True,
+                                    history=None, summary="", client=None):
+        """
+        Async stream_career_advice for the ASGI chat routes
+        
+        Yields:
+            str: Successive chunks of the AI-generated career advice
+        """
+        if not self.providers.available:
+            yield self._fallback(message, personality_type, 'no_llm')
+            return
+        
+        cache_key = None
+        if use_cache and self.cache_enabled:
+            cache_key = self._prompt_key(message, personality_type, resume_data, history, summary)
+        if cache_key:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        try:
+            async with self.scheduler.aslot(client):
+                async for chunk in self._astream_llm(message, personality_type, resume_data, history, summary,
+                                                     cache_key):
+                    yield chunk
+        except Overloaded:
+            yield self._fallback(message, personality_type, 'overloaded')
+    
+    async def _astream_llm(self, message, personality_type, resume_data, history, summary, cache_key):
+        """Async _stream_llm"""
+        if not self.breaker.allow():
+            yield self._fallback(message, personality_type, 'circuit_open')
+            return
+        
+        chunks = []
+        first_token_seconds = None
+        recorded = False
+        started = time.monotonic()
+        try:
+            async for chunk in self.providers.astream(
+                self._format_messages(message, personality_type, resume_data, history, summary)
+            ):
+                if chunk:
+                    if first_token_seconds is None:
+                        first_token_seconds = time.monotonic() - started
+                    chunks.append(chunk)
+                    yield chunk
+            self.breaker.record_success(first_token_seconds if first_token_seconds is not None
+                                        else time.monotonic() - started)
+            recorded = True
+            if cache_key:
+                self.response_cache.set(cache_key, ''.join(chunks).strip())
+        except Exception as e:
+            print(f"Error streaming AI response: {e}")
+            if not recorded:
+                self.breaker.record_failure()
+                recorded = True
+            if chunks:
+                raise
+            yield self._fallback(message, personality_type, 'error')
+        finally:
+            if not recorded:
+                self.breaker.release()
+    
+    def _invoke_llm(self, messages, client=None):
+        """Call the provider pool through the scheduler and circuit breaker"""
+        with self.scheduler.slot(client):
+            if not self.breaker.allow():
+                raise CircuitOpenError('LLM circuit is open')
+            started = time.monotonic()
+            try:
+                response = self.providers.invoke(messages).strip()
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            self.breaker.record_success(time.monotonic() - started)
+            return response
+    
+    async def _ainvoke_llm(self, messages, client=None):
+        """Async _invoke_llm"""
+        async with self.scheduler.aslot(client):
+            if not self.breaker.allow():
+                raise CircuitOpenError('LLM circuit is open')
+            started = time.monotonic()
+            try:
+                response = (await self.providers.ainvoke(messages)).strip()
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            self.breaker.record_success(time.monotonic() - started)
+            return response
+    
+    def _prompt_key(self, message, personality_type, resume_data, history=None, summary=""):
+        """
+        Build the key identifying a prompt for caching and request coalescing
+        
+        Messages are case-folded with whitespace and trailing punctuation
+        collapsed so trivially different phrasings share an entry. Conversation
+        context is part of the key, so only context-free prompts are shared widely.
+        """
+        normalized_message = ' '.join(message.casefold().split()).rstrip('?!. ')
+        resume_hash = hashlib.sha256(resume_data.encode('utf-8')).hexdigest() if resume_data else ''
+        context_hash = ''
+        if history or summary:
+            context = '\x1e'.join([summary or ''] + [f"{m}\x1f{r}" for m, r in history or []])
+            context_hash = hashlib.sha256(context.encode('utf-8')).hexdigest()
+        return (personality_type or '', normalized_message, resume_hash, context_hash, self.model_name, self.temperature)
+    
+    def _build_inputs(self, message, personality_type, resume_data, history=None, summary=""):
+        """Fill the career prompt variables, substituting defaults for missing context"""
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+        
+        turns = []
+        for user_message, response in history or []:
+            turns.append(HumanMessage(content=user_message))
+            turns.append(AIMessage(content=response))
+        
+        return {
+            "personality_type": personality_type or "General",
+            "resume_data": resume_data or "No resume information provided",
+            "user_message": message,
+            "conversation_summary": [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] if summary else [],
+            "history": turns
+        }
+    
+    def _format_messages(self, message, personality_type, resume_data, history=None, summary=""):
+        """Render the career prompt into chat messages"""
+        return self.career_prompt.format_messages(
+            **self._build_inputs(message, personality_type, resume_data, history, summary)
+        )
+    
+    def _fallback(self, message, personality_type, reason):
+        """Default response, counted by why the LLM wasn't used"""
+        chat_fallbacks_total.inc(reason)
+        return self._get_default_response(message, personality_type)
     
     def _get_default_response(self, message, personality_type):
         """
@@ -0,0 +1,146 @@
+"""
+Circuit breaker for calls to slow or failing dependencies
+Tracks the outcome and latency of recent calls; once too many fail or run slow it
+opens and rejects calls outright for a cool-down period, then lets a few probe
+calls through (half-open) to decide whether to close again.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+BREAKER_ENABLED = os.getenv('LLM_BREAKER_ENABLED', 'true').lower() != 'false'
+# Outcomes of the last WINDOW calls are considered, once there are at least MIN_CALLS
+WINDOW = int(os.getenv('LLM_BREAKER_WINDOW', 20))
+MIN_CALLS = int(os.getenv('LLM_BREAKER_MIN_CALLS', 10))
+FAILURE_RATE = float(os.getenv('LLM_BREAKER_FAILURE_RATE', 0.5))
+# Calls slower than SLOW_CALL_SECONDS count as slow; too many slow calls also trip the breaker
+SLOW_CALL_SECONDS = float(os.getenv('LLM_BREAKER_SLOW_CALL_SECONDS', 8))
+SLOW_CALL_RATE = float(os.getenv('LLM_BREAKER_SLOW_CALL_RATE', 0.8))
+COOL_DOWN = float(os.getenv('LLM_BREAKER_COOL_DOWN', 30))
+HALF_OPEN_PROBES = int(os.getenv('LLM_BREAKER_HALF_OPEN_PROBES', 2))
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+# Numeric state for metrics
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling through an open breaker"""
+
+
+class CircuitBreaker:
+    """Thread-safe count-window circuit breaker"""
+
+    def __init__(self, name, enabled=BREAKER_ENABLED, window=WINDOW, min_calls=MIN_CALLS,
+                 failure_rate=FAILURE_RATE, slow_call_seconds=SLOW_CALL_SECONDS, slow_call_rate=SLOW_CALL_RATE,
+                 cool_down=COOL_DOWN, half_open_probes=HALF_OPEN_PROBES, clock=time.monotonic):
+        self.name = name
+        self.enabled = enabled
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.cool_down = cool_down
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)  # (failed, slow) per call
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def allow(self):
+        """Whether a call may proceed; a True in half-open state reserves a probe slot"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, latency):
+        """Record a completed call and its latency in seconds"""
+        self._record(False, latency >= self.slow_call_seconds)
+
+    def record_failure(self):
+        """Record a failed call"""
+        self._record(True, False)
+
+    def release(self):
+        """Give back a probe slot for a call whose outcome doesn't count (e.g. abandoned by the client)"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            state = self._current_state()
+            calls = len(self._outcomes)
+            return {
+                'state': state,
+                'state_code': STATE_CODES[state],
+                'calls_in_window': calls,
+                'failure_rate': sum(failed for failed, _ in self._outcomes) / calls if calls else 0.0,
+                'slow_call_rate': sum(slow for _, slow in self._outcomes) / calls if calls else 0.0,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected
+            }
+
+    def _record(self, failed, slow):
+        if not self.enabled:
+            return
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed or slow:
+                    self._open()
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        self._transition(CLOSED)
+                        self._outcomes.clear()
+                return
+            if state == OPEN:
+                return  # a call that started before the breaker opened
+            self._outcomes.append((failed, slow))
+            calls = len(self._outcomes)
+            if calls >= self.min_calls:
+                failures = sum(f for f, _ in self._outcomes)
+                slow_calls = sum(s for _, s in self._outcomes)
+                if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+                    self._open()
+
+    def _current_state(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.cool_down:
+            self._transition(HALF_OPEN)
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        return self._state
+
+    def _open(self):
+        self._opened_at = self._clock()
+        self.times_opened += 1
+        self._transition(OPEN)
+
+    def _transition(self, state):
+        if state != self._state:
+            print(f"Circuit breaker '{self.name}': {self._state} -> {state}")
+            self._state = state
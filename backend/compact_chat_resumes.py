@@ -0,0 +1,76 @@
+"""
+Chat resume compaction migration
+Moves resume text stored inline on chat_sessions rows into the deduplicated
+resume_blobs table and replaces it with a content-hash reference.
+
+Run init_db() (start the app once) first so the new table and column exist.
+
+Usage: python compact_chat_resumes.py [--database database.db] [--chunk-size 1000] [--vacuum]
+"""
+
+import argparse
+import os
+import time
+
+from db import DATABASE_PATH, ConnectionPool
+from models import store_resume_blob
+
+
+def compact(pool, chunk_size):
+    """Compact rows chunk by chunk, one transaction per chunk"""
+    last_id = 0
+    compacted = 0
+    while True:
+        conn = pool.acquire()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute('''
+                SELECT id, resume_data FROM chat_sessions
+                WHERE id > ? AND resume_data IS NOT NULL
+                ORDER BY id
+                LIMIT ?
+            ''', (last_id, chunk_size)).fetchall()
+
+            updates = [(store_resume_blob(conn, row['resume_data']), row['id']) for row in rows]
+            conn.executemany('''
+                UPDATE chat_sessions SET resume_hash = COALESCE(resume_hash, ?), resume_data = NULL
+                WHERE id = ?
+            ''', updates)
+            conn.commit()
+        finally:
+            pool.release(conn)
+
+        if not rows:
+            return compacted
+        last_id = rows[-1]['id']
+        compacted += len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move inline chat resume text into deduplicated resume_blobs')
+    parser.add_argument('--database', default=DATABASE_PATH)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--vacuum', action='store_true', help='Reclaim the freed space afterwards')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    size_before = os.path.getsize(args.database)
+    pool = ConnectionPool(args.database, size=1)
+    compacted = compact(pool, args.chunk_size)
+
+    if args.vacuum:
+        conn = pool.acquire()
+        try:
+            conn.execute('VACUUM')
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        finally:
+            pool.release(conn)
+    pool.close_all()
+
+    size_after = os.path.getsize(args.database)
+    print(f"Compacted {compacted} chat rows in {time.perf_counter() - start:.1f}s; "
+          f"database {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
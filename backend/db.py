@@ -0,0 +1,109 @@
+"""
+Database access layer
+Pooled SQLite connections in WAL mode, shared by the Flask routes and model helpers
+"""
+
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+DATABASE_PATH = os.getenv('DATABASE_PATH', 'database.db')
+
+# Connection tuning (see https://www.sqlite.org/pragma.html)
+POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', 16))
+BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 16384))
+MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 128 * 1024 * 1024))
+SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+STATEMENT_CACHE_SIZE = int(os.getenv('SQLITE_STATEMENT_CACHE_SIZE', 256))
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections for one worker process"""
+
+    def __init__(self, path=DATABASE_PATH, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        """Open a connection with WAL journaling and tuned pragmas"""
+        # isolation_level=None keeps reads in autocommit mode so they never hold
+        # a snapshot open; writes go through transaction() with BEGIN IMMEDIATE.
+        # The sqlite3 statement cache reuses prepared statements per connection.
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={SYNCHRONOUS}')
+        conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def _check_fork(self):
+        """SQLite connections must not cross a fork; start fresh in the child"""
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._idle = queue.LifoQueue(maxsize=self.size)
+
+    def acquire(self):
+        """Check out an idle connection, opening a new one if none is free"""
+        self._check_fork()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        """Return a connection to the pool, closing it if the pool is full"""
+        if conn.in_transaction:
+            conn.rollback()
+        if os.getpid() != self._pid:
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self):
+        """Close every idle connection (used on shutdown)"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+pool = ConnectionPool()
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection for reads"""
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+@contextmanager
+def transaction():
+    """Borrow a pooled connection and run the block in a write transaction"""
+    with connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
@@ -0,0 +1,62 @@
+"""
+Gunicorn configuration
+Prefork workers, each running a pool of threads, so a slow OpenAI call ties up
+one thread rather than the whole site.
+With GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker and asgi:app, chat
+requests are served by an event loop instead (see asgi.py).
+"""
+
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+# Ignored by the uvicorn worker, which uses ASGI_THREADS for the wrapped Flask routes
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Build the app before forking so workers share its read-only state
+preload_app = True
+
+# Streaming chat replies can legitimately take a while
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+# Time in-flight requests get to finish after SIGTERM
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+# Workers write metrics snapshots here so /metrics reports all of them (see metrics.py);
+# set before the app is preloaded, which is when metrics.py reads it
+_own_metrics_dir = not os.getenv('METRICS_DIR')
+if _own_metrics_dir:
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='career-metrics-')
+
+
+def pre_fork(server, worker):
+    """Close the SQLite connections the preloaded app opened in the master (init_db) so none cross the fork"""
+    from db import pool
+    pool.close_all()
+
+
+def post_worker_init(worker):
+    """Load the chatbot's LangChain stack in the background, and pick up interrupted parse jobs, once the worker is serving"""
+    import metrics
+    from app import chatbot, recover_parse_jobs
+    chatbot.start_warm_up()
+    metrics.start_flusher()
+    recover_parse_jobs()
+
+
+def worker_exit(server, worker):
+    """Stop this worker's process pools, close its database connections and write its final metrics"""
+    from app import shutdown
+    shutdown()
+
+
+def on_exit(server):
+    """Remove the metrics directory made for this server"""
+    if _own_metrics_dir:
+        shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
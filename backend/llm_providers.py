@@ -0,0 +1,617 @@
+"""
+LLM provider layer for the career chatbot
+Holds one or more OpenAI-compatible backends and answers each prompt from the
+first that responds well: every call has a deadline, a slow call is hedged with
+a duplicate on another backend once it passes that backend's usual latency
+(within a small budget of calls, and counted against the chat concurrency cap),
+and a failed call fails over to the next backend.
+"""
+
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import llm_errors_total, llm_first_token_seconds, llm_request_seconds, llm_tokens_total
+from pools import LocalPool
+
+# Optional JSON list of backends, tried in order, e.g.
+# [{"name": "openai", "model": "gpt-4o-mini"},
+#  {"name": "local", "model": "llama3.1", "base_url": "http://localhost:11434/v1", "api_key": "unused"}]
+# Entries may set api_key or api_key_env (default OPENAI_API_KEY), temperature, max_tokens and timeout.
+# Without it the chatbot uses a single OpenAI backend configured by OPENAI_API_KEY/OPENAI_BASE_URL.
+PROVIDERS_JSON = os.getenv('LLM_PROVIDERS', '')
+
+# Seconds a whole answer may take, hedges and failovers included
+DEADLINE = float(os.getenv('LLM_DEADLINE', 20))
+# Timeout of each HTTP call to a backend, and retries inside it
+REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', 15))
+MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 1))
+
+# A call still running past this percentile of its backend's recent latency is hedged
+# on the next backend; backends with fewer than LATENCY_MIN_SAMPLES finished calls aren't hedged
+HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', 'true').lower() != 'false'
+HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', 95))
+HEDGE_MIN_DELAY = float(os.getenv('LLM_HEDGE_MIN_DELAY', 1.0))
+# Also hedge with a second call to the same backend when there is no other one
+HEDGE_SAME_BACKEND = os.getenv('LLM_HEDGE_SAME_BACKEND', 'false').lower() == 'true'
+# Most hedges as a share of calls, and how many unused ones can be saved up
+HEDGE_BUDGET = float(os.getenv('LLM_HEDGE_BUDGET', 0.05))
+HEDGE_BUDGET_BURST = 5
+LATENCY_WINDOW = 200
+LATENCY_MIN_SAMPLES = 20
+
+MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 64))
+
+
+class LLMProvider:
+    """One OpenAI-compatible backend; its LangChain client is built on first use"""
+
+    def __init__(self, name, model, api_key, base_url=None, temperature=0.5, max_tokens=500,
+                 timeout=REQUEST_TIMEOUT):
+        self.name = name
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self._client = None
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.first_token_latencies = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.failures = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from langchain_openai import ChatOpenAI
+                    self._client = ChatOpenAI(
+                        model=self.model,
+                        temperature=self.temperature,
+                        max_tokens=self.max_tokens,
+                        openai_api_key=self.api_key,
+                        base_url=self.base_url,
+                        timeout=self.timeout,
+                        max_retries=MAX_RETRIES,
+                        # Token counts for streamed answers too
+                        stream_usage=True
+                    )
+        return self._client
+
+    def invoke(self, messages):
+        """Return the full answer text"""
+        started = time.perf_counter()
+        try:
+            message = self.client.invoke(messages)
+        except Exception:
+            llm_errors_total.inc(self.name)
+            raise
+        self._record_usage(message)
+        llm_request_seconds.observe(time.perf_counter() - started, self.name, 'invoke')
+        return message.content
+
+    def stream(self, messages):
+        """Yield answer text chunks as they arrive"""
+        started = time.perf_counter()
+        first = True
+        try:
+            for chunk in self.client.stream(messages):
+                self._record_usage(chunk)
+                if chunk.content:
+                    if first:
+                        llm_first_token_seconds.observe(time.perf_counter() - started, self.name)
+                        first = False
+                    yield chunk.content
+        except Exception:
+            llm_errors_total.inc(self.name)
+            raise
+        llm_request_seconds.observe(time.perf_counter() - started, self.name, 'stream')
+
+    async def ainvoke(self, messages):
+        """Return the full answer text without blocking the event loop"""
+        started = time.perf_counter()
+        try:
+            message = await self.client.ainvoke(messages)
+        except Exception:
+            llm_errors_total.inc(self.name)
+            raise
+        self._record_usage(message)
+        llm_request_seconds.observe(time.perf_counter() - started, self.name, 'invoke')
+        return message.content
+
+    async def astream(self, messages):
+        """Yield answer text chunks as they arrive, without blocking the event loop"""
+        started = time.perf_counter()
+        first = True
+        try:
+            async for chunk in self.client.astream(messages):
+                self._record_usage(chunk)
+                if chunk.content:
+                    if first:
+                        llm_first_token_seconds.observe(time.perf_counter() - started, self.name)
+                        first = False
+                    yield chunk.content
+        except Exception:
+            llm_errors_total.inc(self.name)
+            raise
+        llm_request_seconds.observe(time.perf_counter() - started, self.name, 'stream')
+
+    def _record_usage(self, message):
+        """Count the prompt and completion tokens the backend reported, if any"""
+        usage = message.usage_metadata
+        if usage:
+            llm_tokens_total.inc(self.name, 'prompt', amount=usage.get('input_tokens', 0))
+            llm_tokens_total.inc(self.name, 'completion', amount=usage.get('output_tokens', 0))
+
+    def hedge_delay(self, streaming=False):
+        """Seconds to wait on this backend before sending a hedge, or None until its latency is known"""
+        samples = self.first_token_latencies if streaming else self.latencies
+        if len(samples) < LATENCY_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))
+        return max(HEDGE_MIN_DELAY, ordered[index])
+
+    def stats(self):
+        ordered = sorted(self.latencies)
+        return {
+            'model': self.model,
+            'base_url': self.base_url,
+            'calls': self.calls,
+            'failures': self.failures,
+            'p50_latency': ordered[len(ordered) // 2] if ordered else None,
+            'hedge_delay': self.hedge_delay()
+        }
+
+
+class ProviderPool:
+    """Answers prompts from an ordered list of providers with deadlines, hedging and failover"""
+
+    def __init__(self, providers, deadline=DEADLINE, hedge_enabled=HEDGE_ENABLED,
+                 hedge_same_backend=HEDGE_SAME_BACKEND, hedge_budget=HEDGE_BUDGET,
+                 max_concurrency=MAX_CONCURRENCY):
+        self.providers = list(providers)
+        self.deadline = deadline
+        self.hedge_enabled = hedge_enabled
+        self.hedge_same_backend = hedge_same_backend
+        self.hedge_budget = hedge_budget
+        self.max_concurrency = max_concurrency
+        # Anything with try_acquire()/release() (the chat scheduler); hedges take one of its slots
+        self.admission = None
+        self._lock = threading.Lock()
+        self._hedge_credit = 0.0
+        self._running = 0
+        self._background = set()
+        self._pool = LocalPool(lambda: ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='llm'))
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+        self.failovers = 0
+        self.timeouts = 0
+
+    @classmethod
+    def from_env(cls, model, temperature, api_key=None, base_url=None):
+        """Build from LLM_PROVIDERS, or a single backend from the given defaults"""
+        if PROVIDERS_JSON:
+            providers = []
+            for index, entry in enumerate(json.loads(PROVIDERS_JSON)):
+                providers.append(LLMProvider(
+                    name=entry.get('name', f'provider-{index}'),
+                    model=entry.get('model', model),
+                    api_key=entry.get('api_key') or os.getenv(entry.get('api_key_env', 'OPENAI_API_KEY')),
+                    base_url=entry.get('base_url'),
+                    temperature=entry.get('temperature', temperature),
+                    max_tokens=entry.get('max_tokens', 500),
+                    timeout=entry.get('timeout', REQUEST_TIMEOUT)
+                ))
+            return cls([provider for provider in providers if provider.api_key])
+        if api_key:
+            return cls([LLMProvider('openai', model, api_key, base_url=base_url, temperature=temperature)])
+        return cls([])
+
+    @property
+    def available(self):
+        return bool(self.providers)
+
+    def warm_up(self):
+        """Build every provider's client ahead of the first request"""
+        for provider in self.providers:
+            provider.client
+
+    def invoke(self, messages):
+        """
+        Return the first successful answer
+
+        A losing call can't be interrupted; it runs to the end in its thread so
+        its latency still counts towards its backend's hedge delay.
+
+        Raises:
+            TimeoutError: No provider answered within the deadline
+            Exception: The last provider error, once every provider has failed
+        """
+        deadline = time.monotonic() + self.deadline
+        untried = list(self.providers)
+        pending = {}
+        last_error = None
+
+        def launch(provider, hedge=False):
+            provider.calls += 1
+            started = time.monotonic()
+
+            def finished(future):
+                if hedge:
+                    self._release_hedge()
+                if future.exception() is None:
+                    provider.latencies.append(time.monotonic() - started)
+
+            future = self._submit(provider.invoke, messages)
+            future.add_done_callback(finished)
+            pending[future] = (provider, hedge)
+
+        primary = untried.pop(0)
+        hedge_at = self._hedge_at(primary)
+        launch(primary)
+        while pending:
+            wake_at = deadline if hedge_at is None else min(hedge_at, deadline)
+            done, _ = wait(pending, timeout=max(0.0, wake_at - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                provider, hedge = pending.pop(future)
+                try:
+                    answer = future.result()
+                except Exception as e:
+                    provider.failures += 1
+                    last_error = e
+                    if untried and not pending:
+                        self.failovers += 1
+                        launch(untried.pop(0))
+                    continue
+                if hedge:
+                    self.hedge_wins += 1
+                return answer
+
+            if done:
+                continue
+            if time.monotonic() >= deadline:
+                break
+            if hedge_at is not None:
+                hedge_at = None
+                provider = self._take_hedge(primary, untried)
+                if provider is not None:
+                    launch(provider, hedge=True)
+
+        if pending:
+            self.timeouts += 1
+            raise TimeoutError(f'No LLM provider answered within {self.deadline:.0f}s')
+        raise last_error or RuntimeError('No LLM provider configured')
+
+    def stream(self, messages):
+        """
+        Yield chunks from whichever provider produces the first one
+
+        Hedging and failover only happen before the first chunk; after that the
+        stream is committed to its provider, and losing streams stop at their
+        first chunk (after recording its latency).
+        """
+        deadline = time.monotonic() + self.deadline
+        events = queue.Queue()
+        untried = list(self.providers)
+        attempts = {}
+        last_error = None
+
+        def run(attempt, provider, started, cancel, hedge):
+            first = True
+            try:
+                for chunk in provider.stream(messages):
+                    if first:
+                        provider.first_token_latencies.append(time.monotonic() - started)
+                        first = False
+                    if cancel.is_set():
+                        return
+                    events.put((attempt, 'chunk', chunk))
+                provider.latencies.append(time.monotonic() - started)
+                events.put((attempt, 'end', None))
+            except Exception as e:
+                events.put((attempt, 'error', e))
+            finally:
+                if hedge:
+                    self._release_hedge()
+
+        def launch(provider, hedge=False):
+            provider.calls += 1
+            attempt = len(attempts)
+            attempts[attempt] = (provider, threading.Event(), hedge)
+            self._submit(run, attempt, provider, time.monotonic(), attempts[attempt][1], hedge)
+            return attempt
+
+        primary = untried.pop(0)
+        hedge_at = self._hedge_at(primary, streaming=True)
+        live = {launch(primary)}
+        winner = None
+        try:
+            while live:
+                if winner is None:
+                    wake_at = deadline if hedge_at is None else min(hedge_at, deadline)
+                    timeout = max(0.0, wake_at - time.monotonic())
+                else:
+                    timeout = attempts[winner][0].timeout
+                try:
+                    attempt, kind, value = events.get(timeout=timeout)
+                except queue.Empty:
+                    if winner is not None:
+                        raise TimeoutError('LLM stream stalled')
+                    if time.monotonic() >= deadline:
+                        self.timeouts += 1
+                        raise TimeoutError(f'No LLM provider answered within {self.deadline:.0f}s')
+                    if hedge_at is not None:
+                        hedge_at = None
+                        provider = self._take_hedge(primary, untried)
+                        if provider is not None:
+                            live.add(launch(provider, hedge=True))
+                    continue
+
+                if winner is not None and attempt != winner:
+                    continue
+                provider, _, hedge = attempts[attempt]
+                if kind == 'error':
+                    provider.failures += 1
+                    live.discard(attempt)
+                    if winner is not None:
+                        raise value
+                    last_error = value
+                    if untried and not live:
+                        self.failovers += 1
+                        live.add(launch(untried.pop(0)))
+                    continue
+                if winner is None:
+                    winner = attempt
+                    if hedge:
+                        self.hedge_wins += 1
+                    for other, (_, other_cancel, _) in attempts.items():
+                        if other != attempt:
+                            other_cancel.set()
+                if kind == 'end':
+                    return
+                yield value
+        finally:
+            for _, cancel, _ in attempts.values():
+                cancel.set()
+
+        raise last_error or RuntimeError('No LLM provider configured')
+
+    async def ainvoke(self, messages):
+        """
+        Async invoke(): same deadline, hedging and failover
+
+        A losing call is left to finish in the background so its latency is
+        recorded; calls still running at the deadline are cancelled.
+        """
+        deadline = time.monotonic() + self.deadline
+        untried = list(self.providers)
+        pending = {}
+        last_error = None
+
+        def launch(provider, hedge=False):
+            provider.calls += 1
+            started = time.monotonic()
+
+            def finished(task):
+                if hedge:
+                    self._release_hedge()
+                if not task.cancelled() and task.exception() is None:
+                    provider.latencies.append(time.monotonic() - started)
+
+            task = asyncio.ensure_future(provider.ainvoke(messages))
+            task.add_done_callback(finished)
+            pending[task] = (provider, hedge)
+
+        primary = untried.pop(0)
+        hedge_at = self._hedge_at(primary)
+        launch(primary)
+        try:
+            while pending:
+                wake_at = deadline if hedge_at is None else min(hedge_at, deadline)
+                done, _ = await asyncio.wait(pending, timeout=max(0.0, wake_at - time.monotonic()),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider, hedge = pending.pop(task)
+                    try:
+                        answer = task.result()
+                    except Exception as e:
+                        provider.failures += 1
+                        last_error = e
+                        if untried and not pending:
+                            self.failovers += 1
+                            launch(untried.pop(0))
+                        continue
+                    if hedge:
+                        self.hedge_wins += 1
+                    self._keep_running(pending)
+                    pending.clear()
+                    return answer
+
+                if done:
+                    continue
+                if time.monotonic() >= deadline:
+                    self.timeouts += 1
+                    raise TimeoutError(f'No LLM provider answered within {self.deadline:.0f}s')
+                if hedge_at is not None:
+                    hedge_at = None
+                    provider = self._take_hedge(primary, untried)
+                    if provider is not None:
+                        launch(provider, hedge=True)
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error or RuntimeError('No LLM provider configured')
+
+    async def astream(self, messages):
+        """
+        Async stream(): hedging and failover before the first chunk
+
+        Losing streams stop at their first chunk (after recording its latency);
+        streams still waiting at the deadline are cancelled.
+        """
+        deadline = time.monotonic() + self.deadline
+        events = asyncio.Queue()
+        untried = list(self.providers)
+        attempts = {}
+        losers = set()
+        last_error = None
+
+        async def run(attempt, provider, started):
+            first = True
+            try:
+                async for chunk in provider.astream(messages):
+                    if first:
+                        provider.first_token_latencies.append(time.monotonic() - started)
+                        first = False
+                    if attempt in losers:
+                        return
+                    await events.put((attempt, 'chunk', chunk))
+                provider.latencies.append(time.monotonic() - started)
+                await events.put((attempt, 'end', None))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await events.put((attempt, 'error', e))
+
+        def launch(provider, hedge=False):
+            provider.calls += 1
+            attempt = len(attempts)
+            task = asyncio.ensure_future(run(attempt, provider, time.monotonic()))
+            if hedge:
+                task.add_done_callback(lambda _: self._release_hedge())
+            attempts[attempt] = (provider, task, hedge)
+            return attempt
+
+        primary = untried.pop(0)
+        hedge_at = self._hedge_at(primary, streaming=True)
+        live = {launch(primary)}
+        winner = None
+        try:
+            while live:
+                if winner is None:
+                    wake_at = deadline if hedge_at is None else min(hedge_at, deadline)
+                    timeout = max(0.0, wake_at - time.monotonic())
+                else:
+                    timeout = attempts[winner][0].timeout
+                try:
+                    attempt, kind, value = await asyncio.wait_for(events.get(), timeout)
+                except asyncio.TimeoutError:
+                    if winner is not None:
+                        raise TimeoutError('LLM stream stalled')
+                    if time.monotonic() >= deadline:
+                        self.timeouts += 1
+                        raise TimeoutError(f'No LLM provider answered within {self.deadline:.0f}s')
+                    if hedge_at is not None:
+                        hedge_at = None
+                        provider = self._take_hedge(primary, untried)
+                        if provider is not None:
+                            live.add(launch(provider, hedge=True))
+                    continue
+
+                if winner is not None and attempt != winner:
+                    continue
+                provider, _, hedge = attempts[attempt]
+                if kind == 'error':
+                    provider.failures += 1
+                    live.discard(attempt)
+                    if winner is not None:
+                        raise value
+                    last_error = value
+                    if untried and not live:
+                        self.failovers += 1
+                        live.add(launch(untried.pop(0)))
+                    continue
+                if winner is None:
+                    winner = attempt
+                    if hedge:
+                        self.hedge_wins += 1
+                    losers.update(other for other in attempts if other != attempt)
+                    self._keep_running({task: None for other, (_, task, _) in attempts.items() if other != attempt})
+                if kind == 'end':
+                    return
+                yield value
+        finally:
+            for attempt, (_, task, _) in attempts.items():
+                if attempt not in losers:
+                    task.cancel()
+
+        raise last_error or RuntimeError('No LLM provider configured')
+
+    def stats(self):
+        return {
+            'providers': {provider.name: provider.stats() for provider in self.providers},
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'hedges_skipped': self.hedges_skipped,
+            'failovers': self.failovers,
+            'timeouts': self.timeouts
+        }
+
+    def _hedge_at(self, primary, streaming=False):
+        """
+        When to consider hedging a call that started now, or None if it won't be
+
+        Every call earns hedge_budget of a hedge, so hedges stay within that
+        share of calls (with a little credit saved up for bursts).
+        """
+        if not self.hedge_enabled:
+            return None
+        with self._lock:
+            self._hedge_credit = min(HEDGE_BUDGET_BURST, self._hedge_credit + self.hedge_budget)
+        delay = primary.hedge_delay(streaming)
+        return None if delay is None else time.monotonic() + delay
+
+    def _take_hedge(self, primary, untried):
+        """
+        The backend to send a hedge to, or None to let the call run on alone
+
+        Hedges go to the next untried backend (the same one only with
+        LLM_HEDGE_SAME_BACKEND), and only while the budget, the call pool and
+        the admission slots have room. The caller releases the slot with
+        _release_hedge when the hedge finishes.
+        """
+        if not untried and not self.hedge_same_backend:
+            return None
+        with self._lock:
+            if self._hedge_credit < 1 or self._running >= self.max_concurrency:
+                self.hedges_skipped += 1
+                return None
+            if self.admission is not None and not self.admission.try_acquire():
+                self.hedges_skipped += 1
+                return None
+            self._hedge_credit -= 1
+            self.hedges += 1
+        return untried.pop(0) if untried else primary
+
+    def _release_hedge(self):
+        if self.admission is not None:
+            self.admission.release()
+
+    def _keep_running(self, tasks):
+        """Let losing async calls finish in the background, holding references until they do"""
+        for task in tasks:
+            if not task.done():
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+
+    def _submit(self, fn, *args):
+        """Run fn on the call pool, counting it as running until it returns"""
+        with self._lock:
+            self._running += 1
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(self._call_finished)
+        return future
+
+    def _call_finished(self, _):
+        with self._lock:
+            self._running -= 1
@@ -0,0 +1,386 @@
+"""
+Prometheus metrics
+Counters and latency histograms kept in process memory and rendered in the
+Prometheus text format by GET /metrics. Recording is a dict lookup and a few
+additions under a lock. Numbers other modules already keep (cache hit counts,
+breaker state, scheduler queue) are read from their stats() at scrape time
+rather than counted twice.
+With METRICS_DIR set (gunicorn.conf.py sets it), every worker writes a snapshot
+of its metrics there every METRICS_FLUSH_INTERVAL seconds and /metrics merges
+them, so a scrape reports the whole server whichever worker answers it: counters
+and histograms are summed (including workers that have exited), and the gauges
+read at scrape time are reported per running worker with a pid label.
+"""
+
+import bisect
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from functools import wraps
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() != 'false'
+# Directory shared by the worker processes; unset reports this process only
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+# Seconds between snapshots; other workers' numbers are at most this stale on a scrape
+FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+# Seconds; fine-grained at the low end for cached routes and SQL
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def state(self):
+        with self._lock:
+            return [[list(label_values), value] for label_values, value in self._values.items()]
+
+    def samples(self, states=None):
+        """Samples for this process, or summed over (pid, state) pairs from several"""
+        totals = {}
+        for _, state in states if states is not None else [(None, self.state())]:
+            for label_values, value in state:
+                label_values = tuple(label_values)
+                totals[label_values] = totals.get(label_values, 0) + value
+        for label_values, value in totals.items():
+            yield self.name, dict(zip(self.labels, label_values)), value
+
+
+class Histogram:
+    """Distribution of observed values (usually seconds) per label combination"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [per-bucket counts (last is +Inf), sum]
+
+    def observe(self, value, *label_values):
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *label_values):
+        """Context manager observing the duration of its block"""
+        return _Timer(self, label_values)
+
+    def state(self):
+        with self._lock:
+            return [[list(label_values), list(counts), total] for label_values, (counts, total) in self._series.items()]
+
+    def samples(self, states=None):
+        """Samples for this process, or summed over (pid, state) pairs from several"""
+        merged = {}
+        for _, state in states if states is not None else [(None, self.state())]:
+            for label_values, counts, total in state:
+                series = merged.setdefault(tuple(label_values), [[0] * len(counts), 0.0])
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total
+        for label_values, (counts, total) in merged.items():
+            labels = dict(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', dict(labels, le=_format_value(bound)), cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, cumulative
+
+
+class Collector:
+    """Metric whose samples come from a callback at scrape time"""
+
+    def __init__(self, name, help, kind, labels, collect):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labels = labels
+        self._collect = collect
+
+    def state(self):
+        return [[list(label_values), value] for label_values, value in self._collect()]
+
+    def samples(self, states=None):
+        """Samples for this process, or each worker's (pid, state) labelled with its pid"""
+        if states is None:
+            for label_values, value in self._collect():
+                yield self.name, dict(zip(self.labels, label_values)), value
+            return
+        for pid, state in states:
+            for label_values, value in state:
+                yield self.name, dict(zip(self.labels, label_values), pid=str(pid)), value
+
+
+class _Timer:
+    __slots__ = ('histogram', 'label_values', 'started')
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+
+
+class Registry:
+    """The set of metrics /metrics renders"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        """Every metric's current state, keyed by name, for merging across processes"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        states = {}
+        for metric in metrics:
+            try:
+                states[metric.name] = metric.state()
+            except Exception as e:
+                print(f"Metric {metric.name} failed to collect: {e}")
+        return states
+
+    def render(self, snapshots=None):
+        """
+        Return every metric in the Prometheus text exposition format
+
+        Args:
+            snapshots (list): (pid, running, states) per process to merge; None renders this process
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                if snapshots is None:
+                    samples = list(metric.samples())
+                else:
+                    # Gauges read at scrape time only mean something for workers still running
+                    cumulative = not isinstance(metric, Collector)
+                    samples = list(metric.samples([
+                        (pid, states[metric.name]) for pid, running, states in snapshots
+                        if metric.name in states and (running or cumulative)
+                    ]))
+            except Exception as e:
+                print(f"Metric {metric.name} failed to collect: {e}")
+                continue
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in samples:
+                if labels:
+                    label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+                    lines.append(f'{name}{{{label_text}}} {_format_value(value)}')
+                else:
+                    lines.append(f'{name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help, labels=()):
+    return REGISTRY.register(Counter(name, help, labels))
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, labels, buckets))
+
+
+def collector(name, help, kind='gauge', labels=(), collect=None):
+    """Register a metric read at scrape time; collect() yields (label values tuple, value) pairs"""
+    return REGISTRY.register(Collector(name, help, kind, labels, collect))
+
+
+def render():
+    """This process's metrics, merged with the other workers' when METRICS_DIR is set"""
+    if not METRICS_DIR:
+        return REGISTRY.render()
+    flush()
+    return REGISTRY.render(_read_snapshots())
+
+
+_flush_lock = threading.Lock()
+_flusher_pid = None
+_exited = False
+
+
+def flush(exited=False):
+    """
+    Write this process's snapshot to METRICS_DIR
+
+    exited=True writes the final snapshot of a stopping worker under a name of its own,
+    so its counters keep counting towards the totals even if a new worker reuses its pid.
+    """
+    global _exited
+    if not METRICS_DIR or not METRICS_ENABLED:
+        return
+    with _flush_lock:
+        if _exited:
+            return
+        pid = os.getpid()
+        payload = json.dumps({'pid': pid, 'metrics': REGISTRY.snapshot()})
+        descriptor, temp_path = tempfile.mkstemp(dir=METRICS_DIR, suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as f:
+            f.write(payload)
+        live_path = os.path.join(METRICS_DIR, f'{pid}.json')
+        if exited:
+            os.replace(temp_path, os.path.join(METRICS_DIR, f'{pid}-{time.time_ns()}.exited.json'))
+            if os.path.exists(live_path):
+                os.remove(live_path)
+            _exited = True
+        else:
+            os.replace(temp_path, live_path)
+
+
+def start_flusher():
+    """Snapshot this worker's metrics every FLUSH_INTERVAL seconds (once per process)"""
+    global _flusher_pid
+    if not METRICS_DIR or not METRICS_ENABLED:
+        return
+    with _flush_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+
+    def run():
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                flush()
+            except Exception as e:
+                print(f"Failed to write metrics snapshot: {e}")
+
+    threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+
+def _read_snapshots():
+    """(pid, running, states) for every worker that has written to METRICS_DIR"""
+    snapshots = []
+    for path in glob.glob(os.path.join(METRICS_DIR, '*.json')):
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue  # Removed or replaced while listing
+        pid = snapshot['pid']
+        running = not path.endswith('.exited.json') and _pid_running(pid)
+        snapshots.append((pid, running, snapshot['metrics']))
+    return snapshots
+
+
+def _pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return str(value)
+
+
+# Metrics recorded across modules
+http_request_seconds = histogram(
+    'http_request_duration_seconds', 'Time until the response body has been sent',
+    ('method', 'route'))
+http_requests_total = counter('http_requests_total', 'Requests by route and status', ('method', 'route', 'status'))
+db_query_seconds = histogram('db_query_duration_seconds', 'Time spent in a models.py query helper', ('query',))
+llm_request_seconds = histogram('llm_request_duration_seconds', 'Time to a complete LLM answer',
+                                ('provider', 'mode'), LLM_BUCKETS)
+llm_first_token_seconds = histogram('llm_first_token_seconds', 'Time to the first streamed token',
+                                    ('provider',), LLM_BUCKETS)
+llm_tokens_total = counter('llm_tokens_total', 'Tokens reported by the LLM', ('provider', 'type'))
+llm_errors_total = counter('llm_errors_total', 'LLM calls that raised', ('provider',))
+chat_fallbacks_total = counter('chat_fallbacks_total', 'Chats answered with the built-in fallback response',
+                               ('reason',))
+
+
+def init_app(app):
+    """Time every Flask request and count it by route and status"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            method = request.method
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            http_requests_total.inc(method, route, str(response.status_code))
+            # The server closes the response once the body is sent, so streams are timed to their end
+            response.call_on_close(
+                lambda: http_request_seconds.observe(time.perf_counter() - started, method, route)
+            )
+        return response
+
+
+def timed(histogram, label=None):
+    """Decorator observing each call's duration, labelled with label or the function's name"""
+    def decorator(fn):
+        label_value = label or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, label_value)
+        return wrapper
+    return decorator
@@ -2,15 +2,43 @@
 User model and database helper functions
 """
 
+import base64
+import hashlib
+import os
 import sqlite3
 import json
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_login import UserMixin
+import zlib
+import passwords
+from cache import TTLCache
+from metrics import db_query_seconds, timed
+from db import connection, transaction
 
+# Resume text (extracted from uploads, and sent with chats) is stored once in
+# resume_blobs, zlib-compressed when it is large enough to benefit
+RESUME_BLOB_COMPRESSION = os.getenv('RESUME_BLOB_COMPRESSION', 'true').lower() != 'false'
+COMPRESSION_MIN_BYTES = 512
 
-class User(UserMixin):
+# History endpoints return pages of at most this many rows
+MAX_PAGE_SIZE = 100
+
+# Users loaded for Flask-Login on every authenticated request; the TTL bounds
+# how stale a profile can be in other worker processes
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1024))
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 60))
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+class User:
     """User model for Flask-Login"""
     
+    __slots__ = ('id', 'email', 'password_hash', 'first_name', 'last_name',
+                 'preferences', 'created_at', 'updated_at')
+    
+    # Flask-Login's UserMixin has no __slots__, so its interface is spelled out here
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+    
     def __init__(self, id, email, password_hash=None, first_name=None, last_name=None, 
                  preferences=None, created_at=None, updated_at=None):
         self.id = id
@@ -33,22 +61,25 @@ class User(UserMixin):
             'created_at': self.created_at,
             'updated_at': self.updated_at
         }
+    
+    def get_id(self):
+        """Return the id Flask-Login stores in the session"""
+        return str(self.id)
+    
+    def __eq__(self, other):
+        if isinstance(other, User):
+            return self.id == other.id
+        return NotImplemented
+    
+    def __hash__(self):
+        return hash(self.id)
 
 
-def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect('database.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
+@timed(db_query_seconds)
 def get_user_by_id(user_id):
     """Get user by ID"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
     
     if row:
         return User(
@@ -64,13 +95,21 @@ def get_user_by_id(user_id):
     return None
 
 
+def get_cached_user(user_id):
+    """Get user by ID through the in-process user cache"""
+    user = user_cache.get(user_id)
+    if user is None:
+        user = get_user_by_id(user_id)
+        if user is not None:
+            user_cache.set(user_id, user)
+    return user
+
+
+@timed(db_query_seconds)
 def get_user_by_email(email):
     """Get user by email"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
-    row = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
     
     if row:
         return User(
@@ -88,32 +127,25 @@ def get_user_by_email(email):
 
 def create_user(email, password, first_name=None, last_name=None):
     """Create a new user"""
-    password_hash = generate_password_hash(password)
+    password_hash = passwords.hash_password(password)
     preferences = json.dumps({})
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('''
-            INSERT INTO users (email, password_hash, first_name, last_name, preferences)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (email, password_hash, first_name, last_name, preferences))
-        conn.commit()
-        user_id = cursor.lastrowid
-        conn.close()
+        with db_query_seconds.time('create_user'), transaction() as conn:
+            cursor = conn.execute('''
+                INSERT INTO users (email, password_hash, first_name, last_name, preferences)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (email, password_hash, first_name, last_name, preferences))
+            user_id = cursor.lastrowid
         
+        user_cache.invalidate(user_id)
         return get_user_by_id(user_id)
     except sqlite3.IntegrityError:
-        conn.close()
         return None  # Email already exists
 
 
 def update_user(user_id, first_name=None, last_name=None, preferences=None):
     """Update user profile"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     updates = []
     values = []
     
@@ -132,73 +164,254 @@ def update_user(user_id, first_name=None, last_name=None, preferences=None):
         values.append(user_id)
         
         query = f'UPDATE users SET {", ".join(updates)} WHERE id = ?'
-        cursor.execute(query, values)
-        conn.commit()
+        with db_query_seconds.time('update_user'), transaction() as conn:
+            conn.execute(query, values)
+        user_cache.invalidate(user_id)
     
-    conn.close()
     return get_user_by_id(user_id)
 
 
 def verify_password(user, password):
     """Verify user password"""
     if user and user.password_hash:
-        return check_password_hash(user.password_hash, password)
+        return passwords.check_password(user.password_hash, password)
     return False
 
 
-def get_user_assessments(user_id):
-    """Get all assessments for a user"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM assessments 
-        WHERE user_id = ? 
-        ORDER BY completed_at DESC
-    ''', (user_id,))
-    rows = cursor.fetchall()
-    conn.close()
+def upgrade_password_hash(user, password):
+    """Rehash a verified password if it was stored with outdated hash parameters"""
+    if not passwords.needs_rehash(user.password_hash):
+        return False
+    
+    password_hash = passwords.hash_password(password)
+    with db_query_seconds.time('upgrade_password_hash'), transaction() as conn:
+        conn.execute('UPDATE users SET password_hash = ? WHERE id = ?', (password_hash, user.id))
+    user.password_hash = password_hash
+    user_cache.invalidate(user.id)
+    return True
+
+
+def encode_cursor(sort_value, row_id):
+    """Encode a keyset position as an opaque cursor string"""
+    return base64.urlsafe_b64encode(json.dumps([sort_value, row_id]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor, raising ValueError if it is malformed"""
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    # Both are bound as SQL parameters, so only scalars SQLite accepts will do (bool is an int subclass)
+    if (not isinstance(row_id, int) or not isinstance(sort_value, (str, int, float))
+            or isinstance(row_id, bool) or isinstance(sort_value, bool)):
+        raise ValueError('Invalid cursor')
+    return sort_value, row_id
+
+
+def _fetch_page(table, columns, where, params, sort_column, limit, cursor):
+    """
+    Fetch one newest-first page of rows using keyset pagination on (sort_column, id)
+    
+    Returns:
+        tuple: (rows, next_cursor), next_cursor being None on the last page
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = f'SELECT {columns} FROM {table} WHERE {where}'
+    params = list(params)
+    if cursor:
+        query += f' AND ({sort_column}, id) < (?, ?)'
+        params.extend(decode_cursor(cursor))
+    query += f' ORDER BY {sort_column} DESC, id DESC LIMIT ?'
+    params.append(limit + 1)
+    
+    with connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][sort_column], rows[-1]['id'])
+    return rows, next_cursor
+
+
+@timed(db_query_seconds)
+def get_user_assessments_page(user_id, limit=20, cursor=None, include_answers=False):
+    """Get one page of a user's assessments, newest first; answers are decoded only on request"""
+    columns = 'id, personality_type, completed_at' + (', answers' if include_answers else '')
+    rows, next_cursor = _fetch_page(
+        'assessments', columns, 'user_id = ?', (user_id,), 'completed_at', limit, cursor
+    )
     
     assessments = []
     for row in rows:
-        assessments.append({
+        assessment = {
             'id': row['id'],
-            'answers': json.loads(row['answers']),
             'personality_type': row['personality_type'],
             'completed_at': row['completed_at']
-        })
-    return assessments
+        }
+        if include_answers:
+            assessment['answers'] = json.loads(row['answers'])
+        assessments.append(assessment)
+    return assessments, next_cursor
 
 
-def get_user_resumes(user_id):
-    """Get all resumes for a user"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM user_resumes 
-        WHERE user_id = ? 
-        ORDER BY uploaded_at DESC
-    ''', (user_id,))
-    rows = cursor.fetchall()
-    conn.close()
+@timed(db_query_seconds)
+def get_user_resumes_page(user_id, limit=20, cursor=None, include_text=False):
+    """Get one page of a user's resumes, newest first; extracted text only on request"""
+    columns = 'id, filename, file_path, uploaded_at, is_current'
+    table = 'user_resumes'
+    if include_text:
+        columns += ', resume_digest, content AS text_content, compressed AS text_compressed'
+        table += ' LEFT JOIN resume_blobs ON resume_blobs.content_hash = user_resumes.text_hash'
+    rows, next_cursor = _fetch_page(
+        table, columns, 'user_id = ?', (user_id,), 'uploaded_at', limit, cursor
+    )
     
     resumes = []
     for row in rows:
-        resumes.append({
+        resume = {
             'id': row['id'],
             'filename': row['filename'],
             'file_path': row['file_path'],
-            'resume_text': row['resume_text'],
             'uploaded_at': row['uploaded_at'],
             'is_current': bool(row['is_current'])
+        }
+        if include_text:
+            resume['resume_text'] = _blob_text(row['text_content'], row['text_compressed'])
+            resume['resume_digest'] = row['resume_digest']
+        resumes.append(resume)
+    return resumes, next_cursor
+
+
+@timed(db_query_seconds)
+def get_user_chats_page(user_id, limit=20, cursor=None, session_id=None):
+    """Get one page of a user's chat messages, newest first, optionally for one session"""
+    where = 'user_id = ?'
+    params = [user_id]
+    if session_id:
+        where += ' AND session_id = ?'
+        params.append(session_id)
+    rows, next_cursor = _fetch_page(
+        'chat_sessions', 'id, session_id, message, response, personality_type, created_at',
+        where, params, 'created_at', limit, cursor
+    )
+    
+    chats = []
+    for row in rows:
+        chats.append({
+            'id': row['id'],
+            'session_id': row['session_id'],
+            'message': row['message'],
+            'response': row['response'],
+            'personality_type': row['personality_type'],
+            'created_at': row['created_at']
         })
-    return resumes
+    return chats, next_cursor
 
 
+@timed(db_query_seconds)
 def get_current_resume(user_id):
-    """Get the current resume for a user"""
-    resumes = get_user_resumes(user_id)
-    for resume in resumes:
-        if resume['is_current']:
-            return resume
-    return None if not resumes else resumes[0]  # Return latest if no current marked
+    """Get the current resume for a user (the latest one if none is marked current)"""
+    with connection() as conn:
+        row = conn.execute('''
+            SELECT r.*, b.content AS text_content, b.compressed AS text_compressed
+            FROM user_resumes r
+            LEFT JOIN resume_blobs b ON b.content_hash = r.text_hash
+            WHERE r.user_id = ?
+            ORDER BY r.is_current DESC, r.uploaded_at DESC, r.id DESC
+            LIMIT 1
+        ''', (user_id,)).fetchone()
+    
+    if row:
+        return {
+            'id': row['id'],
+            'filename': row['filename'],
+            'file_path': row['file_path'],
+            'resume_text': _blob_text(row['text_content'], row['text_compressed']),
+            'resume_digest': row['resume_digest'],
+            'uploaded_at': row['uploaded_at'],
+            'is_current': bool(row['is_current'])
+        }
+    return None
+
+
+@timed(db_query_seconds)
+def get_latest_assessment(user_id):
+    """Get a user's most recent assessment"""
+    with connection() as conn:
+        row = conn.execute('''
+            SELECT id, answers, personality_type, completed_at FROM assessments
+            WHERE user_id = ?
+            ORDER BY completed_at DESC, id DESC
+            LIMIT 1
+        ''', (user_id,)).fetchone()
+    
+    if row:
+        return {
+            'id': row['id'],
+            'answers': json.loads(row['answers']),
+            'personality_type': row['personality_type'],
+            'completed_at': row['completed_at']
+        }
+    return None
+
+
+
+@timed(db_query_seconds)
+def set_resume_digest(resume_id, resume_digest):
+    """Store the prompt digest for a resume"""
+    with transaction() as conn:
+        conn.execute('UPDATE user_resumes SET resume_digest = ? WHERE id = ?', (resume_digest, resume_id))
+
+
+@timed(db_query_seconds)
+def get_resume_job(job_id, user_id):
+    """Get a resume parsing job owned by a user"""
+    with connection() as conn:
+        row = conn.execute('''
+            SELECT * FROM resume_parse_jobs
+            WHERE id = ? AND user_id = ?
+        ''', (job_id, user_id)).fetchone()
+    
+    if row:
+        return {
+            'id': row['id'],
+            'resume_id': row['resume_id'],
+            'status': row['status'],
+            'progress': row['progress'],
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at']
+        }
+    return None
+
+
+@timed(db_query_seconds)
+def store_resume_blob(conn, resume_data):
+    """
+    Store resume text once, keyed by its SHA-256, inside the caller's transaction
+    
+    Returns:
+        str: The content hash to reference from other tables, or None for empty text
+    """
+    if not resume_data:
+        return None
+    
+    raw = resume_data.encode('utf-8')
+    content_hash = hashlib.sha256(raw).hexdigest()
+    exists = conn.execute('SELECT 1 FROM resume_blobs WHERE content_hash = ?', (content_hash,)).fetchone()
+    if not exists:
+        compressed = RESUME_BLOB_COMPRESSION and len(raw) >= COMPRESSION_MIN_BYTES
+        conn.execute('''
+            INSERT OR IGNORE INTO resume_blobs (content_hash, content, compressed, size)
+            VALUES (?, ?, ?, ?)
+        ''', (content_hash, zlib.compress(raw) if compressed else raw, int(compressed), len(raw)))
+    return content_hash
+
 
+def _blob_text(content, compressed):
+    """Decode a resume_blobs row's content, or None when the join found no blob"""
+    if content is None:
+        return None
+    return (zlib.decompress(content) if compressed else content).decode('utf-8')
@@ -0,0 +1,75 @@
+"""
+Password hashing off the request thread
+Runs the password KDF in a small dedicated process pool behind a concurrency
+limit. Requests beyond the limit wait at most HASH_WAIT_TIMEOUT (a fraction of a
+second) for a slot and then get a 503, so a burst of logins is turned away
+quickly instead of pinning web worker threads. A request holding a slot waits
+behind at most HASH_CONCURRENCY / HASH_WORKERS hashes.
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from pools import LocalPool, process_context
+
+# werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:1000000";
+# stored hashes made with other parameters are upgraded on the next login
+HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', 16))
+
+# 0 workers hashes inline on the request thread
+HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+# Hashes queued or running per web worker; further requests wait up to HASH_WAIT_TIMEOUT
+# seconds for a slot before failing with HasherBusy (503); 0 fails immediately
+HASH_CONCURRENCY = int(os.getenv('PASSWORD_HASH_CONCURRENCY', max(HASH_WORKERS, 1) * 4))
+HASH_WAIT_TIMEOUT = float(os.getenv('PASSWORD_HASH_WAIT_TIMEOUT', 0.25))
+
+_slots = threading.BoundedSemaphore(HASH_CONCURRENCY)
+_pool = LocalPool(lambda: ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=process_context()))
+
+
+class HasherBusy(Exception):
+    """Raised when no hashing slot frees up within HASH_WAIT_TIMEOUT"""
+
+
+def hash_password(password):
+    """Hash a password with the configured method"""
+    return _run(generate_password_hash, password, HASH_METHOD, SALT_LENGTH)
+
+
+def check_password(password_hash, password):
+    """Check a password against a stored hash"""
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """Whether a stored hash was made with different parameters than HASH_METHOD"""
+    return password_hash.split('$', 1)[0] != _method_prefix()
+
+
+@lru_cache(maxsize=1)
+def _method_prefix():
+    # werkzeug fills in default parameters, so read them back from a real hash
+    return generate_password_hash('', HASH_METHOD, 1).split('$', 1)[0]
+
+
+def _run(fn, *args):
+    """Run fn in the hashing pool, holding one of the concurrency slots"""
+    acquired = _slots.acquire(timeout=HASH_WAIT_TIMEOUT) if HASH_WAIT_TIMEOUT > 0 else _slots.acquire(blocking=False)
+    if not acquired:
+        raise HasherBusy('Too many sign-in requests, please try again shortly')
+    try:
+        if HASH_WORKERS <= 0:
+            return fn(*args)
+        return _pool.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def shutdown():
+    """Stop the hashing pool"""
+    _pool.shutdown()
@@ -0,0 +1,57 @@
+"""
+Pre-serialized JSON payloads
+Responses that never change between deploys are rendered to bytes once and
+served with strong ETags, Cache-Control and conditional 304 handling.
+"""
+
+import hashlib
+import json
+import os
+
+from flask import Response, request
+
+# How long browsers and proxies may reuse a static payload without revalidating
+STATIC_MAX_AGE = int(os.getenv('STATIC_PAYLOAD_MAX_AGE', 300))
+
+
+def dumps(data):
+    """Serialize the way jsonify does in production (sorted keys, compact separators)"""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'))
+
+
+def dumps_with_fragment(data, key, fragment):
+    """
+    Serialize a dict plus one extra member whose value is already-rendered JSON
+
+    Args:
+        data (dict): Members to serialize normally
+        key (str): Name of the pre-rendered member
+        fragment (str): JSON text for the member's value
+    """
+    body = dumps(data)
+    separator = ',' if len(body) > 2 else ''
+    return f'{body[:-1]}{separator}{json.dumps(key)}:{fragment}}}'
+
+
+def json_response(body, status=200):
+    """Wrap already-rendered JSON text in a response"""
+    return Response(body, status=status, mimetype='application/json')
+
+
+class StaticPayload:
+    """A JSON payload rendered once and served from memory"""
+
+    def __init__(self, data, max_age=STATIC_MAX_AGE):
+        self.body = dumps(data).encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.max_age = max_age
+
+    def response(self):
+        """Build a response for the current request, answering 304 when the client copy is fresh"""
+        if request.if_none_match.contains(self.etag):
+            response = Response(status=304)
+        else:
+            response = Response(self.body, mimetype='application/json')
+        response.set_etag(self.etag)
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+        return response
@@ -0,0 +1,47 @@
+"""
+Per-process worker pools
+An executor that belongs to the process that started it: web workers forked from
+the preloaded master each start their own on first use instead of inheriting
+the master's, whose threads don't survive the fork. Process pools start their
+processes with PROCESS_START_METHOD rather than by forking a threaded web worker,
+whose locks (metrics, write-behind, connection pool) may be held mid-fork.
+"""
+
+import multiprocessing
+import os
+import threading
+
+PROCESS_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def process_context():
+    """multiprocessing context for ProcessPoolExecutor(mp_context=...)"""
+    return multiprocessing.get_context(PROCESS_START_METHOD)
+
+
+class LocalPool:
+    """An executor built by factory() on first use in each process"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """This process's executor, started now if it has none yet"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = self.factory()
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, fn, *args):
+        return self.get().submit(fn, *args)
+
+    def shutdown(self, wait=True):
+        """Stop this process's executor, if it started one; the next use starts a new one"""
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=wait)
+            self._executor = None
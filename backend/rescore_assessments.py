@@ -0,0 +1,132 @@
+"""
+Offline assessment rescoring job
+Streams the assessments table in id order, rescores each chunk in a process pool
+and writes changed personality types back in batched transactions.
+
+Usage: python rescore_assessments.py [--database database.db] [--chunk-size 5000] [--workers N] [--dry-run]
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from assessment_engine import AssessmentEngine
+from db import DATABASE_PATH, ConnectionPool
+
+# Per-process engine, built once by the pool initializer
+_engine = None
+
+
+def _init_worker():
+    global _engine
+    _engine = AssessmentEngine()
+
+
+def rescore_chunk(rows):
+    """
+    Rescore one chunk of (id, answers_json, personality_type) rows
+
+    Returns:
+        list: (new_personality_type, id) for every row whose type changed
+    """
+    answer_sets = []
+    for _, answers, _ in rows:
+        try:
+            answer_sets.append(json.loads(answers))
+        except (TypeError, ValueError):
+            answer_sets.append([])
+
+    personality_types = _engine.calculate_personalities(answer_sets)
+    return [
+        (new_type, row_id)
+        for (row_id, _, old_type), new_type in zip(rows, personality_types)
+        if new_type != old_type
+    ]
+
+
+def iter_chunks(pool, chunk_size):
+    """Yield assessment rows chunk by chunk using keyset pagination on id"""
+    last_id = 0
+    while True:
+        conn = pool.acquire()
+        try:
+            rows = conn.execute('''
+                SELECT id, answers, personality_type FROM assessments
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            ''', (last_id, chunk_size)).fetchall()
+        finally:
+            pool.release(conn)
+
+        if not rows:
+            return
+        last_id = rows[-1]['id']
+        yield [tuple(row) for row in rows]
+
+
+def write_updates(pool, updates):
+    """Write new personality types in a single transaction"""
+    conn = pool.acquire()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany('UPDATE assessments SET personality_type = ? WHERE id = ?', updates)
+        conn.commit()
+    finally:
+        pool.release(conn)
+
+
+def rescore(database, chunk_size, workers, dry_run=False):
+    """Rescore the whole table, keeping at most two chunks per worker in memory"""
+    pool = ConnectionPool(database, size=2)
+    scanned = changed = 0
+    max_pending = workers * 2
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        pending = {}
+        chunks = iter_chunks(pool, chunk_size)
+        exhausted = False
+
+        while pending or not exhausted:
+            # Keep the pool busy without reading ahead of it
+            while not exhausted and len(pending) < max_pending:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                pending[executor.submit(rescore_chunk, chunk)] = len(chunk)
+
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                scanned += pending.pop(future)
+                updates = future.result()
+                changed += len(updates)
+                if updates and not dry_run:
+                    write_updates(pool, updates)
+
+    pool.close_all()
+    return scanned, changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rescore stored assessments with the current question weights')
+    parser.add_argument('--database', default=DATABASE_PATH)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--dry-run', action='store_true', help='Report changes without writing them')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    scanned, changed = rescore(args.database, args.chunk_size, args.workers, args.dry_run)
+    elapsed = time.perf_counter() - start
+
+    action = 'would change' if args.dry_run else 'changed'
+    print(f"Rescored {scanned} assessments in {elapsed:.1f}s; {changed} {action}")
+
+
+if __name__ == '__main__':
+    main()
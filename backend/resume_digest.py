@@ -0,0 +1,109 @@
+"""
+Resume digests for chat prompts
+Condenses extracted resume text into a token-budgeted digest that keeps the most
+useful sections (summary, skills, experience) and drops contact details.
+"""
+
+import hashlib
+import os
+import re
+
+from cache import TTLCache
+
+DIGEST_TOKEN_BUDGET = int(os.getenv('RESUME_DIGEST_TOKENS', 400))
+# Digests of resume text sent with chat requests, keyed by content hash
+DIGEST_CACHE_SIZE = int(os.getenv('RESUME_DIGEST_CACHE_SIZE', 256))
+DIGEST_CACHE_TTL = int(os.getenv('RESUME_DIGEST_CACHE_TTL', 3600))
+
+# Lower values are kept first when the budget is tight
+SECTION_PRIORITY = {
+    'summary': 1, 'profile': 1, 'objective': 1, 'about me': 1,
+    'skills': 2, 'technical skills': 2, 'core competencies': 2,
+    'experience': 3, 'work experience': 3, 'professional experience': 3, 'employment': 3,
+    'education': 4, 'certifications': 4, 'projects': 5
+}
+HEADER_PRIORITY = 0
+OTHER_PRIORITY = 6
+
+# Emails, links and phone numbers (10+ digits, so year ranges survive)
+CONTACT_PATTERN = re.compile(r'@|https?://|www\.|linkedin\.com|(?:\d[\s().+-]*){10,}')
+
+_encoding = None
+
+digest_cache = TTLCache(maxsize=DIGEST_CACHE_SIZE, ttl=DIGEST_CACHE_TTL)
+
+
+def count_tokens(text):
+    """Count tokens with the OpenAI tokenizer, or estimate at ~4 characters per token"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('o200k_base')
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def cached_digest(resume_text):
+    """build_digest for text clients send on every chat request, built once per distinct text"""
+    if not resume_text:
+        return ''
+    key = hashlib.sha256(resume_text.encode('utf-8')).hexdigest()
+    digest = digest_cache.get(key)
+    if digest is None:
+        digest = build_digest(resume_text)
+        digest_cache.set(key, digest)
+    return digest
+
+
+def build_digest(resume_text, token_budget=DIGEST_TOKEN_BUDGET):
+    """
+    Build a digest of resume text that fits within token_budget
+
+    Lines are ranked by the section they belong to, taken greedily in that order
+    until the budget is spent, and emitted in their original order.
+    """
+    if not resume_text:
+        return ''
+
+    lines = [line.strip() for line in resume_text.splitlines()]
+    lines = [line for line in lines if line and not CONTACT_PATTERN.search(line)]
+    if count_tokens('\n'.join(lines)) <= token_budget:
+        return '\n'.join(lines)
+
+    candidates = []
+    headings = set()
+    priority = HEADER_PRIORITY
+    for index, line in enumerate(lines):
+        heading = line.rstrip(':').strip().lower()
+        if heading in SECTION_PRIORITY:
+            priority = SECTION_PRIORITY[heading]
+            headings.add(index)
+        elif priority == HEADER_PRIORITY and index >= 3:
+            # Only the first few lines (name, headline) count as the header
+            priority = OTHER_PRIORITY
+        if count_tokens(line) > token_budget // 2:
+            # Long paragraphs are cut down rather than dropped outright
+            line = lines[index] = line[:token_budget * 2].rsplit(' ', 1)[0] + '...'
+        candidates.append((priority, index, line))
+
+    selected = []
+    used = 0
+    for _, index, line in sorted(candidates):
+        tokens = count_tokens(line) + 1  # newline
+        if used + tokens <= token_budget:
+            selected.append(index)
+            used += tokens
+
+    # Drop headings whose section contributed no lines
+    selected.sort()
+    kept = [
+        index for position, index in enumerate(selected)
+        if index not in headings
+        or (position + 1 < len(selected) and selected[position + 1] not in headings
+            and not any(index < h < selected[position + 1] for h in headings))
+    ]
+    return '\n'.join(lines[index] for index in kept)
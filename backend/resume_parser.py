@@ -0,0 +1,188 @@
+"""
+Background resume parsing
+Extracts text from uploaded PDF/DOCX resumes in a process pool, off the request
+thread, recording progress in the resume_parse_jobs table. Jobs interrupted by a
+restart are picked up again by recover_jobs when a worker starts.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from db import connection, transaction
+from models import store_resume_blob
+from pools import LocalPool, process_context
+from resume_digest import build_digest
+
+PARSER_WORKERS = int(os.getenv('RESUME_PARSER_WORKERS', os.cpu_count() or 1))
+MAX_TEXT_CHARS = int(os.getenv('RESUME_TEXT_MAX_CHARS', 100000))
+
+# Number of progress updates written per document at most
+PROGRESS_STEPS = 10
+
+# A queued or running job untouched this long was lost with the process that queued it
+STALE_JOB_SECONDS = int(os.getenv('RESUME_PARSE_STALE_SECONDS', 600))
+# Times an interrupted job is resubmitted before it is marked failed
+MAX_RESUBMITS = 3
+
+_pool = LocalPool(lambda: ProcessPoolExecutor(max_workers=PARSER_WORKERS, mp_context=process_context()))
+
+
+def extract_text(file_path, on_progress=None):
+    """
+    Extract plain text from a resume file
+
+    Args:
+        file_path (str): Path to a .pdf or .docx file
+        on_progress (callable): Called with a 0-1 fraction as parsing advances
+
+    Returns:
+        str: Extracted text, whitespace-normalized and capped at MAX_TEXT_CHARS
+
+    Raises:
+        ValueError: For unsupported file types
+    """
+    file_ext = os.path.splitext(file_path)[1].lower()
+    if file_ext == '.pdf':
+        parts = _extract_pdf(file_path, on_progress)
+    elif file_ext == '.docx':
+        parts = _extract_docx(file_path, on_progress)
+    else:
+        raise ValueError(f'Text extraction is not supported for {file_ext} files; please upload PDF or DOCX')
+
+    lines = (' '.join(line.split()) for part in parts for line in part.splitlines())
+    return '\n'.join(line for line in lines if line)[:MAX_TEXT_CHARS]
+
+
+def _extract_pdf(file_path, on_progress):
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    total = len(reader.pages)
+    step = max(1, total // PROGRESS_STEPS)
+    parts = []
+    for number, page in enumerate(reader.pages, start=1):
+        parts.append(page.extract_text() or '')
+        if on_progress and (number % step == 0 or number == total):
+            on_progress(number / total)
+    return parts
+
+
+def _extract_docx(file_path, on_progress):
+    from docx import Document
+
+    document = Document(file_path)
+    parts = [paragraph.text for paragraph in document.paragraphs]
+    if on_progress:
+        on_progress(0.5)
+    for table in document.tables:
+        for row in table.rows:
+            parts.append(' | '.join(cell.text for cell in row.cells))
+    if on_progress:
+        on_progress(1.0)
+    return parts
+
+
+def _update_job(job_id, **fields):
+    """Update a job row's status fields"""
+    assignments = ', '.join(f'{name} = ?' for name in fields)
+    with transaction() as conn:
+        conn.execute(
+            f'UPDATE resume_parse_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+            (*fields.values(), job_id)
+        )
+
+
+def make_current(conn, resume_id):
+    """Make resume_id its owner's current resume, and none of their others"""
+    conn.execute('''
+        UPDATE user_resumes SET is_current = (id = ?)
+        WHERE user_id = (SELECT user_id FROM user_resumes WHERE id = ?)
+    ''', (resume_id, resume_id))
+
+
+def run_parse_job(job_id, resume_id, file_path):
+    """Worker entry point: parse one resume and store its text and prompt digest"""
+    _update_job(job_id, status='running')
+    try:
+        resume_text = extract_text(file_path, lambda fraction: _update_job(job_id, progress=round(fraction, 2)))
+    except Exception as e:
+        _update_job(job_id, status='failed', error=str(e))
+        return
+
+    resume_digest = build_digest(resume_text)
+    with transaction() as conn:
+        conn.execute(
+            'UPDATE user_resumes SET text_hash = ?, resume_digest = ? WHERE id = ?',
+            (store_resume_blob(conn, resume_text), resume_digest, resume_id)
+        )
+        make_current(conn, resume_id)
+        conn.execute('''
+            UPDATE resume_parse_jobs
+            SET status = 'completed', progress = 1, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (job_id,))
+
+
+def submit_parse_job(job_id, resume_id, file_path):
+    """Queue a resume for parsing without waiting for it"""
+    def on_done(future):
+        # A crashed worker never reaches its own error handling
+        error = future.exception()
+        if error is not None:
+            _update_job(job_id, status='failed', error=str(error))
+
+    future = _pool.submit(run_parse_job, job_id, resume_id, os.path.abspath(file_path))
+    future.add_done_callback(on_done)
+    return future
+
+
+def recover_jobs():
+    """
+    Resubmit parse jobs left queued or running by a process that has gone
+
+    Jobs only live in the pool of the worker that queued them, so a crash, restart
+    or redeploy leaves their rows unfinished. Each stale row is claimed by one
+    worker, which submits it again, or marks it failed once its file is gone or
+    it has been resubmitted MAX_RESUBMITS times already.
+
+    Returns:
+        int: Number of jobs resubmitted
+    """
+    with connection() as conn:
+        stale = conn.execute('''
+            SELECT j.id, j.resume_id, j.attempts, r.file_path
+            FROM resume_parse_jobs j JOIN user_resumes r ON r.id = j.resume_id
+            WHERE j.status IN ('queued', 'running') AND j.updated_at < datetime('now', ?)
+        ''', (f'-{STALE_JOB_SECONDS} seconds',)).fetchall()
+
+    resubmit = []
+    with transaction() as conn:
+        for job_id, resume_id, attempts, file_path in stale:
+            # Another worker starting at the same time may have claimed it already
+            claimed = conn.execute('''
+                UPDATE resume_parse_jobs
+                SET status = 'queued', progress = 0, attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND attempts = ? AND status IN ('queued', 'running')
+            ''', (job_id, attempts)).rowcount
+            if not claimed:
+                continue
+            if attempts >= MAX_RESUBMITS:
+                error = 'Parsing was interrupted too many times'
+            elif not file_path or not os.path.exists(file_path):
+                error = 'The uploaded file is no longer available'
+            else:
+                resubmit.append((job_id, resume_id, file_path))
+                continue
+            conn.execute('''
+                UPDATE resume_parse_jobs SET status = 'failed', error = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (error, job_id))
+
+    for job_id, resume_id, file_path in resubmit:
+        submit_parse_job(job_id, resume_id, file_path)
+    return len(resubmit)
+
+
+def shutdown():
+    """Stop the parser pool, letting queued jobs finish"""
+    _pool.shutdown()
@@ -0,0 +1,332 @@
+"""
+Admission control for chat requests
+Per-client token buckets turn away scripted floods with a 429, and a global cap
+on concurrent LLM calls queues the rest fairly across clients: each client with
+waiters gets its turn in proportion to its weight, logged-in users counting
+more than guests. Requests whose wait would exceed the queue timeout are shed
+straight away rather than letting latency grow.
+Limits are per process, like the other in-process state.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from cache import TTLCache
+
+SCHEDULER_ENABLED = os.getenv('CHAT_SCHEDULER_ENABLED', 'true').lower() != 'false'
+# Concurrent LLM calls per process; further calls queue
+MAX_CONCURRENT = int(os.getenv('CHAT_MAX_CONCURRENT', 32))
+MAX_QUEUE = int(os.getenv('CHAT_MAX_QUEUE', 256))
+# Longest a call may wait for a slot; calls predicted to wait longer are shed at once
+QUEUE_TIMEOUT = float(os.getenv('CHAT_QUEUE_TIMEOUT', 10))
+# Starting guess for how long a slot is held, refined as calls complete
+EXPECTED_CALL_SECONDS = float(os.getenv('CHAT_EXPECTED_CALL_SECONDS', 3))
+# Share of queue turns a logged-in user gets relative to a guest
+USER_WEIGHT = float(os.getenv('CHAT_USER_WEIGHT', 2))
+
+# Chat requests per minute and burst size, per logged-in user or per guest address
+RATE_LIMIT_ENABLED = os.getenv('CHAT_RATE_LIMIT_ENABLED', 'true').lower() != 'false'
+USER_RATE = float(os.getenv('CHAT_USER_RATE_PER_MINUTE', 30))
+USER_BURST = int(os.getenv('CHAT_USER_BURST', 10))
+GUEST_RATE = float(os.getenv('CHAT_GUEST_RATE_PER_MINUTE', 10))
+GUEST_BURST = int(os.getenv('CHAT_GUEST_BURST', 5))
+# Idle buckets are full again long before they expire
+BUCKET_CACHE_SIZE = 10000
+BUCKET_TTL = 600
+
+
+class RateLimited(Exception):
+    """Raised when a client has used up its chat allowance"""
+
+    def __init__(self, retry_after):
+        super().__init__('Too many chat requests, please slow down')
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    """Raised when an LLM call is shed instead of queued"""
+
+
+class Client:
+    """Who a chat request is scheduled as"""
+
+    __slots__ = ('key', 'authenticated')
+
+    def __init__(self, key, authenticated=False):
+        self.key = key
+        self.authenticated = authenticated
+
+
+# Callers that don't say who they are share one queue
+ANONYMOUS = Client('anonymous')
+
+
+def client_for(user_id, remote_addr):
+    """Schedule logged-in users by account and guests by address (session ids are client-chosen)"""
+    if user_id:
+        return Client(f'user:{user_id}', True)
+    return Client(f'guest:{remote_addr or "unknown"}')
+
+
+def forwarded_addr(remote_addr, forwarded_for, trusted_proxies):
+    """
+    The client's address behind trusted_proxies reverse proxies
+
+    Same rule as werkzeug's ProxyFix(x_for=trusted_proxies): the entry that many
+    hops from the right of X-Forwarded-For, or the socket address when the header
+    is missing or shorter than that (so a client can't pick its own address).
+    """
+    if not trusted_proxies or not forwarded_for:
+        return remote_addr
+    hops = [addr.strip() for addr in forwarded_for.split(',')]
+    if len(hops) < trusted_proxies:
+        return remote_addr
+    return hops[-trusted_proxies] or remote_addr
+
+
+class TokenBucket:
+    """Allows rate tokens per second on average, with bursts of up to burst"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now):
+        """Spend a token; returns 0 on success, else seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+
+class _Waiter:
+    """A queued call, woken by a thread event or, on the event loop, a future"""
+
+    __slots__ = ('granted', 'event', 'future', 'loop')
+
+    def __init__(self, loop=None):
+        self.granted = False
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class _ClientQueue:
+    """A client's waiters and its virtual time (its place in the fair order)"""
+
+    __slots__ = ('waiters', 'vtime', 'weight')
+
+    def __init__(self, vtime, weight):
+        self.waiters = deque()
+        self.vtime = vtime
+        self.weight = weight
+
+
+class ChatScheduler:
+    """Token-bucket rate limits plus a weighted fair queue in front of the LLM"""
+
+    def __init__(self, enabled=SCHEDULER_ENABLED, max_concurrent=MAX_CONCURRENT, max_queue=MAX_QUEUE,
+                 queue_timeout=QUEUE_TIMEOUT, expected_call_seconds=EXPECTED_CALL_SECONDS,
+                 user_weight=USER_WEIGHT, rate_limit_enabled=RATE_LIMIT_ENABLED,
+                 user_rate=USER_RATE, user_burst=USER_BURST, guest_rate=GUEST_RATE, guest_burst=GUEST_BURST,
+                 clock=time.monotonic):
+        self.enabled = enabled
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.user_weight = user_weight
+        self.rate_limit_enabled = rate_limit_enabled
+        self.user_rate = user_rate / 60
+        self.user_burst = user_burst
+        self.guest_rate = guest_rate / 60
+        self.guest_burst = guest_burst
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets = TTLCache(maxsize=BUCKET_CACHE_SIZE, ttl=BUCKET_TTL, clock=clock)
+        self._active = 0
+        self._queues = {}  # client key -> _ClientQueue, only while the client has waiters
+        self._queued = 0
+        self._vclock = 0.0
+        self._call_seconds = expected_call_seconds
+        self.admitted = 0
+        self.queued_total = 0
+        self.rate_limited = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    def check_rate(self, client):
+        """
+        Spend one of the client's chat tokens
+
+        Raises:
+            RateLimited: If the client's bucket is empty
+        """
+        if not self.rate_limit_enabled:
+            return
+        with self._lock:
+            now = self._clock()
+            bucket = self._buckets.get(client.key)
+            if bucket is None:
+                if client.authenticated:
+                    bucket = TokenBucket(self.user_rate, self.user_burst, now)
+                else:
+                    bucket = TokenBucket(self.guest_rate, self.guest_burst, now)
+                self._buckets.set(client.key, bucket)
+            retry_after = bucket.take(now)
+            if retry_after:
+                self.rate_limited += 1
+                raise RateLimited(retry_after)
+
+    @contextmanager
+    def slot(self, client):
+        """Hold one LLM call slot, waiting for it in the fair queue if all are busy"""
+        if not self.enabled:
+            yield
+            return
+        client = client or ANONYMOUS
+        waiter = self._admit(client)
+        if waiter is not None and not waiter.event.wait(self.queue_timeout):
+            self._abandon(client, waiter)
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self._release(self._clock() - started)
+
+    @asynccontextmanager
+    async def aslot(self, client):
+        """slot() for coroutines: waits on the event loop instead of blocking a thread"""
+        if not self.enabled:
+            yield
+            return
+        client = client or ANONYMOUS
+        waiter = self._admit(client, asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._abandon(client, waiter)
+            except asyncio.CancelledError:
+                # The request went away while queued; hand on the slot if it was already granted
+                try:
+                    self._abandon(client, waiter)
+                except Overloaded:
+                    pass
+                else:
+                    self._release(None)
+                raise
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self._release(self._clock() - started)
+
+    def try_acquire(self):
+        """Take a free slot without queueing (for optional calls such as hedges); False if none is free"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self._active < self.max_concurrent and not self._queued:
+                self._active += 1
+                return True
+            return False
+
+    def release(self):
+        """Give back a slot taken with try_acquire"""
+        if self.enabled:
+            self._release(None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'active': self._active,
+                'max_concurrent': self.max_concurrent,
+                'queued': self._queued,
+                'queued_clients': len(self._queues),
+                'expected_call_seconds': round(self._call_seconds, 3),
+                'admitted': self.admitted,
+                'queued_total': self.queued_total,
+                'rate_limited': self.rate_limited,
+                'shed': self.shed,
+                'timed_out': self.timed_out
+            }
+
+    def _admit(self, client, loop=None):
+        """Take a free slot (returns None) or join the client's queue (returns the waiter)"""
+        with self._lock:
+            if self._active < self.max_concurrent and not self._queued:
+                self._active += 1
+                self.admitted += 1
+                return None
+
+            # Each slot frees up about once per call duration, so this is roughly when our turn comes
+            expected_wait = (self._queued + 1) / self.max_concurrent * self._call_seconds
+            if self._queued >= self.max_queue or expected_wait > self.queue_timeout:
+                self.shed += 1
+                raise Overloaded('Chat is busy, try again shortly')
+
+            queue = self._queues.get(client.key)
+            if queue is None:
+                # A client joining starts at the current virtual time, so idle time earns no credit
+                weight = self.user_weight if client.authenticated else 1.0
+                queue = self._queues[client.key] = _ClientQueue(self._vclock, weight)
+            waiter = _Waiter(loop)
+            queue.waiters.append(waiter)
+            self._queued += 1
+            self.queued_total += 1
+            return waiter
+
+    def _abandon(self, client, waiter):
+        """Leave the queue after a timeout; a waiter granted in the meantime keeps its slot"""
+        with self._lock:
+            if waiter.granted:
+                return
+            queue = self._queues[client.key]
+            queue.waiters.remove(waiter)
+            if not queue.waiters:
+                del self._queues[client.key]
+            self._queued -= 1
+            self.timed_out += 1
+        raise Overloaded('Timed out waiting for a chat slot')
+
+    def _release(self, call_seconds):
+        """Hand the slot to the next waiter in fair order, or free it"""
+        with self._lock:
+            if call_seconds is not None:
+                self._call_seconds += 0.2 * (call_seconds - self._call_seconds)
+            if not self._queued:
+                self._active -= 1
+                return
+            # Smallest virtual time goes next; ties go to the client that queued first
+            key = min(self._queues, key=lambda k: self._queues[k].vtime)
+            queue = self._queues[key]
+            waiter = queue.waiters.popleft()
+            self._vclock = queue.vtime
+            queue.vtime += 1 / queue.weight
+            if not queue.waiters:
+                del self._queues[key]
+            self._queued -= 1
+            self.admitted += 1
+            waiter.granted = True
+        waiter.wake()
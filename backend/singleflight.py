@@ -0,0 +1,136 @@
+"""
+Request coalescing
+Concurrent callers asking for the same key share a single in-flight execution
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    """One in-flight execution and the outcome its waiters will receive"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run fn() unless a call for key is already in flight, in which case wait for its result
+
+        Args:
+            key: Hashable identity of the request
+            fn (callable): Zero-argument function producing the result
+            timeout (float): Longest a waiter blocks on another caller's execution
+
+        Returns:
+            The result of the shared execution
+
+        Raises:
+            TimeoutError: If the in-flight call does not finish within timeout
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if not call.done.wait(timeout):
+            raise TimeoutError(f"Timed out after {timeout}s waiting for in-flight request")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self, key):
+        """Whether a call for key is running, so a caller now would share it"""
+        with self._lock:
+            return key in self._calls
+
+    def stats(self):
+        """Return execution and coalescing counters"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executions': self.executions,
+                'coalesced': self.coalesced
+            }
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop"""
+
+    def __init__(self):
+        self._tasks = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key, coro_fn, timeout=None):
+        """
+        Await coro_fn() unless a call for key is already in flight, in which case await its result
+
+        Args:
+            key: Hashable identity of the request
+            coro_fn (callable): Zero-argument function returning a coroutine
+            timeout (float): Longest a waiter awaits another caller's execution
+
+        Returns:
+            The result of the shared execution
+
+        Raises:
+            TimeoutError: If the in-flight call does not finish within timeout
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(coro_fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            # A leader whose client disconnects must not cancel the call for its waiters
+            return await asyncio.shield(task)
+
+        self.coalesced += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timed out after {timeout}s waiting for in-flight request")
+
+    def in_flight(self, key):
+        """Whether a call for key is running, so a caller now would share it"""
+        return key in self._tasks
+
+    def stats(self):
+        """Return execution and coalescing counters"""
+        return {
+            'in_flight': len(self._tasks),
+            'executions': self.executions,
+            'coalesced': self.coalesced
+        }
@@ -0,0 +1,110 @@
+"""
+Resume file storage
+Uploaded files are written straight from the request body into a partial file
+in the upload folder, hashed on the way, and stored under their SHA-256 so
+identical files are kept once. The multipart parser writes into UploadPart
+(see UploadRequest in app.py) instead of its own temporary file, so each upload
+touches the disk once and the size cap applies as the body arrives.
+"""
+
+import hashlib
+import os
+import tempfile
+
+UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', 5 * 1024 * 1024))
+# Room for the multipart boundaries, headers and small form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES"""
+
+
+class UploadPart:
+    """
+    Writable, readable file for one uploaded file, hashing what is written
+
+    Lives as a .part file in the upload folder until save_upload renames it;
+    closing it unsaved deletes it.
+    """
+
+    def __init__(self, max_bytes=MAX_UPLOAD_BYTES, upload_dir=UPLOAD_FOLDER):
+        os.makedirs(upload_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=upload_dir, suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self._digest = hashlib.sha256()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.upload_dir = upload_dir
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.close()
+            raise UploadTooLarge(f'Upload exceeds {self.max_bytes} bytes')
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+    def close(self):
+        """Close the file, deleting it unless save_upload already moved it into place"""
+        if not self._file.closed:
+            self._file.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+    def __getattr__(self, name):
+        # read, readline, seek, tell, ... for werkzeug's FileStorage
+        return getattr(self._file, name)
+
+
+def save_upload(stream, file_ext, max_bytes=MAX_UPLOAD_BYTES, upload_dir=UPLOAD_FOLDER):
+    """
+    Move an upload into content-addressed storage
+
+    Args:
+        stream: The UploadPart the request body was parsed into, or any readable binary
+            file object, which is copied (and hashed) in chunks
+        file_ext (str): Extension to keep on the stored file (e.g. '.pdf')
+        max_bytes (int): Size cap; reading stops as soon as it is exceeded
+
+    Returns:
+        tuple: (file_path, content_hash); file_path already existed if the content was seen before
+
+    Raises:
+        UploadTooLarge: If the stream is longer than max_bytes
+    """
+    part = stream if isinstance(stream, UploadPart) else _copy_to_part(stream, max_bytes, upload_dir)
+    try:
+        part.flush()
+        content_hash = part.hexdigest()
+        file_path = os.path.join(part.upload_dir, content_hash + file_ext)
+        if not os.path.exists(file_path):
+            os.replace(part.path, file_path)
+            part.path = None
+        return file_path, content_hash
+    finally:
+        part.close()
+
+
+def _copy_to_part(stream, max_bytes, upload_dir):
+    part = UploadPart(max_bytes, upload_dir)
+    try:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                return part
+            part.write(chunk)
+    except BaseException:
+        part.close()
+        raise
+
+
+def upload_stream_factory(total_content_length, content_type, filename=None, content_length=None):
+    """werkzeug stream_factory that parses uploaded files straight into UploadParts"""
+    return UploadPart()
@@ -0,0 +1,138 @@
+"""
+Write-behind queue for request logging
+Collects fire-and-forget inserts (assessment and chat logs) and writes them on a
+background thread in batched transactions, so responses don't wait on the disk.
+Disabled by default: writes then run synchronously on the request thread.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+from db import transaction
+
+WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+# Longest a queued write waits for its batch to fill
+FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 0.1))
+BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 200))
+QUEUE_SIZE = int(os.getenv('WRITE_BEHIND_QUEUE_SIZE', 10000))
+# When the queue is full a request waits this long for room, then writes synchronously
+PUT_TIMEOUT = float(os.getenv('WRITE_BEHIND_PUT_TIMEOUT', 0.5))
+
+_STOP = object()
+
+
+class WriteBehind:
+    """Queue of write(conn) callables flushed in batches by a background thread"""
+
+    def __init__(self, enabled=WRITE_BEHIND_ENABLED, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 queue_size=QUEUE_SIZE, put_timeout=PUT_TIMEOUT):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.put_timeout = put_timeout
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.overflows = 0
+
+    def submit(self, write):
+        """Queue write(conn) for the next batch, or run it now if disabled or the queue stays full"""
+        if not self.enabled:
+            return self._write_now(write)
+        try:
+            self._started().put(write, timeout=self.put_timeout)
+        except queue.Full:
+            # Backpressure: the request pays for its own write rather than growing the queue
+            self.overflows += 1
+            self._write_now(write)
+
+    def close(self):
+        """Flush everything queued and stop the background thread"""
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                return
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        """Return queue depth and write counters"""
+        return {
+            'enabled': self.enabled,
+            'queued': self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0,
+            'written': self.written,
+            'batches': self.batches,
+            'failed': self.failed,
+            'overflows': self.overflows
+        }
+
+    def _started(self):
+        """Return this process's queue, starting its flusher thread on first use"""
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                # A forked worker must not inherit the parent's queue or thread
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                name='write-behind', daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+            return self._queue
+
+    def _run(self, pending):
+        """Flusher loop: gather up to batch_size writes or flush_interval, then commit them together"""
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not _STOP and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            if batch:
+                self._write_batch(batch)
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        """Run a batch in one transaction, isolating each write in a savepoint"""
+        written = failed = 0
+        try:
+            with transaction() as conn:
+                for write in batch:
+                    conn.execute('SAVEPOINT write_behind')
+                    try:
+                        write(conn)
+                        conn.execute('RELEASE write_behind')
+                        written += 1
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO write_behind')
+                        conn.execute('RELEASE write_behind')
+                        failed += 1
+                        print(f"Write-behind write failed: {e}")
+            self.written += written
+            self.failed += failed
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"Write-behind batch failed: {e}")
+
+    def _write_now(self, write):
+        with transaction() as conn:
+            write(conn)
+
+
+writer = WriteBehind()
+atexit.register(writer.close)
@@ -0,0 +1,12 @@
+"""
+WSGI entry point for production servers
+Importing this module builds the app, so with gunicorn's preload_app the
+assessment engine, chatbot and pre-rendered payloads are created once in the
+master process and shared by every forked worker.
+
+Usage: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import create_app
+
+app = create_app()
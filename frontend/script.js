@@ -422,10 +422,10 @@ async function uploadResume() {
     if (!file) return;
     
     // Validate file type
-    const allowedTypes = ['application/pdf', 'application/msword', 
+    const allowedTypes = ['application/pdf',
                          'application/vnd.openxmlformats-officedocument.wordprocessingml.document'];
     if (!allowedTypes.includes(file.type)) {
-        alert('Please upload a PDF, DOC, or DOCX file.');
+        alert('Please upload a PDF or DOCX file.');
         fileInput.value = '';
         return;
     }
@@ -901,10 +901,10 @@ async function uploadResumeFromProfile() {
     if (!file) return;
     
     // Validate file type
-    const allowedTypes = ['application/pdf', 'application/msword', 
+    const allowedTypes = ['application/pdf',
                          'application/vnd.openxmlformats-officedocument.wordprocessingml.document'];
     if (!allowedTypes.includes(file.type)) {
-        alert('Please upload a PDF, DOC, or DOCX file.');
+        alert('Please upload a PDF or DOCX file.');
         fileInput.value = '';
         return;
     }